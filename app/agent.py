@@ -1,28 +1,69 @@
 import os
+import logging
 import datetime
-from langchain_openai import ChatOpenAI
+import time
+import random
+import threading
+import httpx
+from contextlib import contextmanager
+from typing import Optional, TYPE_CHECKING
 from langchain_core.prompts import ChatPromptTemplate
-from langchain.agents import create_tool_calling_agent, AgentExecutor
-from app.tools import get_customer_profile, check_system_status, search_knowledge_base
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.utils.json import parse_partial_json
+from langchain_core.callbacks import BaseCallbackHandler
+from pydantic import ValidationError
+from app.tools import (
+    get_customer_profile, check_system_status, search_knowledge_base, submit_resolution,
+    prefetch_context, aprefetch_context,
+)
 from app.models import TicketResolution
+from app.context_builder import compact_prompt, tool_result, render_steps, ticket_budget
+from app.llm_replay import wrap_chat_model, provider_api_key
+from app import metrics, scheduler
+from app.logging_setup import PRODUCTION
 
-# Ensure API Key
-if "OPENAI_API_KEY" not in os.environ:
-    raise ValueError("OPENAI_API_KEY environment variable is not set")
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
 
-def run_agent(message: str, customer_id: str):
-    llm = ChatOpenAI(model="gpt-5-mini", temperature=0)
-    tools = [get_customer_profile, check_system_status, search_knowledge_base]
-    
-    # Capture current server time for accurate date comparisons (e.g. 7-day refund policy).
-    current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+logger = logging.getLogger(__name__)
+trace_logger = logging.getLogger("app.agent.trace")
+
+MODEL_NAME = "gpt-5-mini"
+
+# USD per 1M tokens, used for the cost estimate in /metrics.
+PRICE_PROMPT_PER_1M = float(os.getenv("LLM_PRICE_PROMPT_PER_1M", "0.25"))
+PRICE_COMPLETION_PER_1M = float(os.getenv("LLM_PRICE_COMPLETION_PER_1M", "2.00"))
+
+# Single-pass mode: the agent's final turn submits the TicketResolution itself
+# (via `submit_resolution`); the second structuring LLM call is only a fallback.
+SINGLE_PASS = os.getenv("AGENT_SINGLE_PASS", "true").lower() in ("1", "true", "yes")
+
+# Prefetch mode: the customer profile and region status are looked up before the first
+# model turn and handed to the model as already-executed tool calls.
+PREFETCH = os.getenv("AGENT_PREFETCH", "true").lower() in ("1", "true", "yes")
 
-    system_prompt = """
+# LangChain's step-by-step console dump of every executor run (off in production logging mode).
+AGENT_VERBOSE = os.getenv("AGENT_VERBOSE", "false" if PRODUCTION else "true").lower() in ("1", "true", "yes")
+
+# Every run records a compact trace (tool calls and timings, LLM calls). It is logged for
+# failed runs and for this fraction of successful ones; otherwise it is discarded.
+AGENT_TRACE_SAMPLE_RATE = float(os.getenv("AGENT_TRACE_SAMPLE_RATE", "0"))
+# Tool inputs longer than this are truncated in traces.
+TRACE_INPUT_CHARS = 200
+
+# Connection pool shared by every request to the model provider (keep-alive reuse).
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+# Static instructions. Nothing per-ticket goes in here: the system prompt (with the
+# mode instructions below) is the byte-identical prefix of every model call, which lets
+# the provider's prefix cache serve it. Per-ticket values go in the user message.
+SYSTEM_PROMPT = """
     # Role
     You are the **Senior Support Triage Agent**. Your goal is to analyze tickets, verify facts using tools, and determine the optimal resolution.
 
     # Context
-    - **Current Time**: {current_time} (CRITICAL: Use this to verify 7-day refund policy validity)
+    - **Current Time**: given with each ticket (CRITICAL: Use this to verify 7-day refund policy validity)
 
     # Capabilities & Tools (MANDATORY USAGE)
     1. `get_customer_profile(id)`: **MUST CALL FIRST**. Identify Plan (Free/Pro/Ent) & Value.
@@ -79,32 +120,392 @@ def run_agent(message: str, customer_id: str):
     1. Retrieve User Profile -> 2. Check Tools -> 3. Apply Decision Matrix -> 4. Output JSON.
     """
 
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
-        ("user", "Customer ID: {customer_id}\nMessage: {message}"),
-        ("placeholder", "{agent_scratchpad}"),
-    ])
-    
-    agent = create_tool_calling_agent(llm, tools, prompt)
-    executor = AgentExecutor(agent=agent, tools=tools, verbose=True, return_intermediate_steps=True)
-    
-    result = executor.invoke({
+# Appended to the system prompt in single-pass mode.
+SINGLE_PASS_INSTRUCTION = """
+    # Output
+    Do not answer in free text. Your final step MUST be a single call to `submit_resolution` with every decision field.
+    `executed_tools` is recorded automatically; do not include it.
+    """
+
+# Appended to the system prompt in prefetch mode.
+PREFETCH_INSTRUCTION = """
+    # Prefetched Context
+    `get_customer_profile` and `check_system_status` (customer's home region) have already been executed for this ticket;
+    their results appear as the first tool calls in the conversation. Do NOT call them again for the same inputs.
+    Only call tools for facts you still need (e.g. `search_knowledge_base`, or the status of a different region).
+    """
+
+def _prefetch_messages(prefetched: list[tuple]) -> list:
+    """
+    Render prefetched lookups as one assistant tool-call turn followed by the tool results,
+    exactly as if the agent had made the calls itself.
+    """
+    if not prefetched:
+        return []
+    tool_calls = [
+        {"name": name, "args": args, "id": f"prefetch_{i}"}
+        for i, (name, args, _) in enumerate(prefetched)
+    ]
+    messages = [AIMessage(content="", tool_calls=tool_calls)]
+    for call, (_, _, output) in zip(tool_calls, prefetched):
+        messages.append(ToolMessage(content=tool_result(output), tool_call_id=call["id"]))
+    return messages
+
+def _agent_inputs(message: str, customer_id: str, prefetched: list[tuple], current_time: Optional[str] = None) -> dict:
+    # Capture current server time for accurate date comparisons (e.g. 7-day refund policy).
+    # Evaluations pass a fixed time so runs are reproducible (and replayable).
+    current_time = current_time or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return {
         "message": message, 
         "customer_id": customer_id,
-        "current_time": current_time
-    })
-    
-    # Final cleanup: Ensure the LLM output strictly matches our Pydantic schema.
-    # Feed the raw logs + output back to the model to fill in traceability fields.
-    structured_llm = llm.with_structured_output(TicketResolution)
-    final_object = structured_llm.invoke(f"""
+        "current_time": current_time,
+        "prefetched": _prefetch_messages(prefetched),
+    }
+
+RESOLUTION_PROMPT = """
     Analyze the following interaction to produce the TicketResolution.
-    
-    User Message: {message}
-    Agent Execution Logs: {result['intermediate_steps']}
-    Agent Final Response: {result['output']}
-    
-    Based on these logs, fill the schema fields (including executed_tools and reasoning_trace).
-    """)
-    
-    return final_object
+    Based on the tool calls, fill the schema fields (including executed_tools and reasoning_trace).
+    """
+
+def _resolution_prompt(message: str, result: dict, prefetched: list[tuple]) -> str:
+    # Feed the tool calls + output back to the model to fill in traceability fields
+    # (static instructions first, per-ticket content last).
+    return compact_prompt(RESOLUTION_PROMPT) + (
+        f"\n\nUser Message: {message}"
+        f"\nTool Calls (all count as executed tools):\n{render_steps(prefetched, result['intermediate_steps'])}"
+        f"\nAgent Final Response: {result['output']}"
+    )
+
+class _UserResponseStream:
+    """
+    Pulls the `user_response` text out of the streamed arguments of a `submit_resolution`
+    tool call, so the reply can be shown while the model is still writing it.
+    """
+
+    def __init__(self):
+        self._names = {}
+        self._args = {}
+        self._sent = 0
+
+    def feed(self, run_id: str, chunk) -> str:
+        delta = ""
+        for tool_chunk in getattr(chunk, "tool_call_chunks", None) or []:
+            # Tool-call chunks are keyed by their index within one model turn.
+            key = (run_id, tool_chunk.get("index"))
+            if tool_chunk.get("name"):
+                self._names[key] = tool_chunk["name"]
+            self._args[key] = self._args.get(key, "") + (tool_chunk.get("args") or "")
+            if self._names.get(key) != submit_resolution.name:
+                continue
+            parsed = parse_partial_json(self._args[key]) if self._args[key] else None
+            text = parsed.get("user_response") if isinstance(parsed, dict) else None
+            if isinstance(text, str) and len(text) > self._sent:
+                delta += text[self._sent:]
+                self._sent = len(text)
+        return delta
+
+class _UsageTracker(BaseCallbackHandler):
+    """
+    Per-ticket callback: times every LLM call and records its token usage,
+    both process-wide (metrics) and as totals for the ticket. Usage is also
+    reported to the admission scheduler, which settles its rate-limit reservation.
+    """
+
+    # Called inline on the event loop instead of via a thread pool hop.
+    run_inline = True
+
+    def __init__(self):
+        self.phase = "agent"
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._started = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            metrics.LLM_CALL_SECONDS.observe(time.perf_counter() - started, phase=self.phase)
+        metrics.LLM_CALLS.inc(phase=self.phase)
+        usage = {}
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or usage
+        prompt, completion = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+        self.prompt_tokens += prompt
+        self.completion_tokens += completion
+        metrics.LLM_TOKENS.inc(prompt, phase=self.phase, kind="prompt")
+        metrics.LLM_TOKENS.inc(completion, phase=self.phase, kind="completion")
+        metrics.LLM_COST.inc((prompt * PRICE_PROMPT_PER_1M + completion * PRICE_COMPLETION_PER_1M) / 1_000_000)
+        scheduler.record_llm_usage(prompt + completion)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
+
+    def finish(self):
+        metrics.TICKET_TOKENS.observe(self.prompt_tokens, kind="prompt")
+        metrics.TICKET_TOKENS.observe(self.completion_tokens, kind="completion")
+
+class _TraceRecorder(BaseCallbackHandler):
+    """
+    Per-ticket callback that keeps a compact list of agent steps in memory.
+    Nothing is formatted or written unless the trace is emitted.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self.steps = []
+        self._started = {}
+
+    def record_prefetched(self, prefetched: list[tuple]):
+        for name, args, _ in prefetched:
+            self.steps.append({"tool": name, "input": str(args)[:TRACE_INPUT_CHARS], "status": "prefetched"})
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._started[run_id] = (serialized.get("name"), input_str, time.perf_counter())
+
+    def _tool_done(self, run_id, status: str):
+        name, input_str, started = self._started.pop(run_id, (None, "", time.perf_counter()))
+        self.steps.append({
+            "tool": name,
+            "input": str(input_str)[:TRACE_INPUT_CHARS],
+            "status": status,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+        })
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._tool_done(run_id, "ok")
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._tool_done(run_id, f"error: {error}")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self.steps.append({"llm": "call"})
+
+    def emit(self, level: int, customer_id: str, outcome: str):
+        path = " -> ".join(step.get("tool") or "llm" for step in self.steps)
+        trace_logger.log(
+            level, f"Agent trace | Customer: {customer_id} | {outcome} | {path}",
+            extra={"customer_id": customer_id, "outcome": outcome, "steps": self.steps},
+        )
+
+@contextmanager
+def _traced(customer_id: str):
+    """
+    Record the run's trace; log it at ERROR if the run fails, or at INFO for a
+    sampled share of successful runs.
+    """
+    trace = _TraceRecorder()
+    try:
+        yield trace
+    except Exception as e:
+        trace.emit(logging.ERROR, customer_id, f"failed: {e}")
+        raise
+    if AGENT_TRACE_SAMPLE_RATE > 0 and random.random() < AGENT_TRACE_SAMPLE_RATE:
+        trace.emit(logging.INFO, customer_id, "sampled")
+
+def _run_config(*handlers) -> dict:
+    return {"callbacks": [handler for handler in handlers if handler is not None]}
+
+class TriageAgent:
+    """
+    Long-lived agent runtime. The model client (with pooled HTTP connections),
+    prompt, tools, executor and structured-output chain are built once and shared
+    by every request; only per-ticket inputs are passed in per call.
+    """
+
+    def __init__(
+        self,
+        model: str = MODEL_NAME,
+        single_pass: bool = SINGLE_PASS,
+        prefetch: bool = PREFETCH,
+        llm: Optional["BaseChatModel"] = None,
+        http_client: Optional[httpx.Client] = None,
+        http_async_client: Optional[httpx.AsyncClient] = None,
+    ):
+        # Heavy imports (OpenAI SDK, langchain agents) are deferred to the first build,
+        # which runs in the background warm-up rather than at module import.
+        from langchain_openai import ChatOpenAI
+        from langchain.agents import create_tool_calling_agent, AgentExecutor
+
+        self.single_pass = single_pass
+        self.prefetch = prefetch
+        self.http_client = http_client or httpx.Client(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+        self.http_async_client = http_async_client or httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+        if llm is None:
+            api_key = provider_api_key()
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY environment variable is not set")
+            llm = ChatOpenAI(
+                model=model,
+                api_key=api_key,
+                temperature=0,
+                # Report token usage on streamed responses too (the executor streams model turns).
+                stream_usage=True,
+                http_client=self.http_client,
+                http_async_client=self.http_async_client,
+            )
+        # Any tool-calling chat model works (e.g. a deterministic stand-in for benchmarks).
+        # With LLM_REPLAY_MODE set, calls are answered from / recorded to the response store.
+        self.llm = wrap_chat_model(llm)
+        self.tools = [get_customer_profile, check_system_status, search_knowledge_base]
+        sections = [SYSTEM_PROMPT]
+        if single_pass:
+            self.tools.append(submit_resolution)
+            sections.append(SINGLE_PASS_INSTRUCTION)
+        if prefetch:
+            sections.append(PREFETCH_INSTRUCTION)
+        self.system_prompt = compact_prompt(*sections)
+
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", self.system_prompt),
+            ("user", "Customer ID: {customer_id}\nCurrent Time: {current_time}\nMessage: {message}"),
+            ("placeholder", "{prefetched}"),
+            ("placeholder", "{agent_scratchpad}"),
+        ])
+
+        agent = create_tool_calling_agent(self.llm, self.tools, prompt)
+        self.executor = AgentExecutor(agent=agent, tools=self.tools, verbose=AGENT_VERBOSE, return_intermediate_steps=True)
+
+        # Final cleanup chain: Ensure the LLM output strictly matches our Pydantic schema.
+        self.structured_llm = self.llm.with_structured_output(TicketResolution)
+
+    def _submitted_resolution(self, result: dict, prefetched: list[tuple]):
+        """
+        The decision the model submitted on its final turn, with `executed_tools`
+        taken from the recorded tool calls. None when the run must fall back to
+        the two-pass structuring call.
+        """
+        if not self.single_pass:
+            return None
+        if not isinstance(result["output"], dict):
+            logger.warning("Agent did not submit a valid resolution, falling back to structuring pass.")
+            return None
+        executed_tools = []
+        called = [name for name, _, _ in prefetched] + [action.tool for action, _ in result["intermediate_steps"]]
+        for name in called:
+            if name != submit_resolution.name and name not in executed_tools:
+                executed_tools.append(name)
+        try:
+            return TicketResolution(**result["output"], executed_tools=executed_tools)
+        except ValidationError as e:
+            logger.warning(f"Submitted resolution failed validation, falling back to structuring pass: {e}")
+            return None
+
+    def run(self, message: str, customer_id: str, current_time: Optional[str] = None) -> TicketResolution:
+        usage = _UsageTracker() if metrics.METRICS_ENABLED or scheduler.SCHEDULER_ENABLED else None
+        with _traced(customer_id) as trace, ticket_budget():
+            with metrics.timed("agent.prefetch"):
+                prefetched = prefetch_context(customer_id) if self.prefetch else []
+            trace.record_prefetched(prefetched)
+            with metrics.timed("agent.executor"):
+                result = self.executor.invoke(
+                    _agent_inputs(message, customer_id, prefetched, current_time), config=_run_config(usage, trace)
+                )
+            resolution = self._submitted_resolution(result, prefetched)
+            if resolution is None:
+                if usage is not None:
+                    usage.phase = "structuring"
+                with metrics.timed("agent.structuring"):
+                    resolution = self.structured_llm.invoke(
+                        _resolution_prompt(message, result, prefetched), config=_run_config(usage, trace)
+                    )
+        if usage is not None:
+            usage.finish()
+        return resolution
+
+    async def _astream_executor(self, inputs: dict, on_event, config: dict) -> dict:
+        """
+        `executor.ainvoke` that also reports progress through `on_event(event, data)`:
+        tool start/end, and `user_response` text while the model writes it.
+        """
+        result = None
+        user_response = _UserResponseStream()
+        async for event in self.executor.astream_events(inputs, config=config, version="v2"):
+            kind, name = event["event"], event["name"]
+            if kind == "on_chat_model_stream":
+                delta = user_response.feed(event["run_id"], event["data"]["chunk"])
+                if delta:
+                    on_event("token", {"text": delta})
+            elif kind == "on_tool_start" and name != submit_resolution.name:
+                on_event("tool_start", {"tool": name, "input": event["data"].get("input")})
+            elif kind == "on_tool_end" and name != submit_resolution.name:
+                on_event("tool_end", {"tool": name})
+            elif kind == "on_chain_end" and not event["parent_ids"]:
+                result = event["data"]["output"]
+        return result
+
+    async def arun(self, message: str, customer_id: str, on_event=None, current_time: Optional[str] = None) -> TicketResolution:
+        usage = _UsageTracker() if metrics.METRICS_ENABLED or scheduler.SCHEDULER_ENABLED else None
+        with _traced(customer_id) as trace, ticket_budget():
+            with metrics.timed("agent.prefetch"):
+                prefetched = await aprefetch_context(customer_id) if self.prefetch else []
+            trace.record_prefetched(prefetched)
+            inputs = _agent_inputs(message, customer_id, prefetched, current_time)
+            with metrics.timed("agent.executor"):
+                if on_event is None:
+                    result = await self.executor.ainvoke(inputs, config=_run_config(usage, trace))
+                else:
+                    for name, args, _ in prefetched:
+                        on_event("tool_end", {"tool": name, "input": args, "prefetched": True})
+                    result = await self._astream_executor(inputs, on_event, _run_config(usage, trace))
+            resolution = self._submitted_resolution(result, prefetched)
+            if resolution is None:
+                if usage is not None:
+                    usage.phase = "structuring"
+                with metrics.timed("agent.structuring"):
+                    resolution = await self.structured_llm.ainvoke(
+                        _resolution_prompt(message, result, prefetched), config=_run_config(usage, trace)
+                    )
+        if usage is not None:
+            usage.finish()
+        return resolution
+
+    async def aclose(self):
+        self.http_client.close()
+        await self.http_async_client.aclose()
+
+# Process-wide runtime, created at startup (or on first use)
+_agent = None
+_agent_lock = threading.Lock()
+
+def get_agent() -> TriageAgent:
+    global _agent
+    if _agent is None:
+        with _agent_lock:
+            if _agent is None:
+                _agent = TriageAgent()
+    return _agent
+
+def init_agent(**kwargs) -> TriageAgent:
+    """
+    Build the process-wide runtime with custom settings (e.g. `llm=` a different
+    chat model), replacing any existing one. Call before serving requests.
+    """
+    global _agent
+    with _agent_lock:
+        if _agent is not None:
+            # The new runtime takes over the old one's connection pools (nothing left unclosed).
+            kwargs.setdefault("http_client", _agent.http_client)
+            kwargs.setdefault("http_async_client", _agent.http_async_client)
+        _agent = TriageAgent(**kwargs)
+    return _agent
+
+async def close_agent():
+    global _agent
+    if _agent is not None:
+        await _agent.aclose()
+        _agent = None
+
+def run_agent(message: str, customer_id: str, current_time: Optional[str] = None) -> TicketResolution:
+    return get_agent().run(message, customer_id, current_time)
+
+async def arun_agent(message: str, customer_id: str, on_event=None, current_time: Optional[str] = None) -> TicketResolution:
+    """
+    Async variant of `run_agent`: model calls, tools and the structuring pass are
+    all awaited, so one worker can interleave many tickets on its event loop.
+    Pass `on_event(event, data)` to receive tool progress and reply tokens as they happen.
+    """
+    return await get_agent().arun(message, customer_id, on_event, current_time)
@@ -0,0 +1,112 @@
+import os
+import json
+import textwrap
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# Tool-result tokens a ticket may put in front of the model in total (every tool result:
+# prefetched and agent-requested lookups, KB passages); results beyond it are trimmed.
+# 0 = unlimited.
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+# Every result keeps at least this many tokens, even once the budget is spent, so a
+# late KB search still returns its best passage instead of nothing.
+CONTEXT_MIN_RESULT_TOKENS = int(os.getenv("CONTEXT_MIN_RESULT_TOKENS", "150"))
+# Rough size of a token, used for budgeting and reports (no tokenizer download needed).
+CHARS_PER_TOKEN = 4
+TRUNCATED_MARK = "\n[truncated]"
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+def compact_prompt(*sections: str) -> str:
+    """
+    Static prompt text with source indentation and blank-line runs removed.
+    Deterministic, so the result is byte-identical for every ticket.
+    """
+    lines = []
+    for section in sections:
+        for line in textwrap.dedent(section).strip().splitlines():
+            line = line.rstrip()
+            if line or (lines and lines[-1]):
+                lines.append(line)
+    return "\n".join(lines)
+
+def serialize(value) -> str:
+    """
+    Compact text form of a tool result: JSON without padding for structured values.
+    """
+    if isinstance(value, str):
+        return value.strip()
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+def compact_passages(passages: list[str]) -> str:
+    """
+    Join retrieved KB chunks without blank lines or the text repeated by chunk overlap.
+    """
+    seen = set()
+    blocks = []
+    for passage in passages:
+        kept = []
+        for line in passage.splitlines():
+            line = " ".join(line.split())
+            if line and line not in seen:
+                seen.add(line)
+                kept.append(line)
+        if kept:
+            blocks.append("\n".join(kept))
+    return "\n\n".join(blocks)
+
+class ContextBudget:
+    """
+    Remaining tool-result allowance of one ticket, in characters. Each result may
+    use at least `min_result_tokens`, whatever is left.
+    """
+
+    def __init__(self, tokens: int, min_result_tokens: int = CONTEXT_MIN_RESULT_TOKENS):
+        self.remaining = tokens * CHARS_PER_TOKEN
+        self.floor = min_result_tokens * CHARS_PER_TOKEN
+
+    def fit(self, text: str) -> str:
+        allowance = max(self.remaining, self.floor)
+        self.remaining = max(self.remaining - len(text), 0)
+        if len(text) <= allowance:
+            return text
+        room = max(allowance - len(TRUNCATED_MARK), 0)
+        # Cut at a line (or at least word) boundary.
+        cut = text.rfind("\n", 0, room)
+        if cut < room // 2:
+            cut = text.rfind(" ", 0, room)
+        trimmed = text[:max(cut, 0)].rstrip() + TRUNCATED_MARK
+        return trimmed.lstrip()
+
+_current_budget: ContextVar[Optional[ContextBudget]] = ContextVar("context_budget", default=None)
+
+@contextmanager
+def ticket_budget(tokens: int = CONTEXT_TOKEN_BUDGET):
+    """
+    `with ticket_budget():` around one agent run; tool results inside it share the budget.
+    """
+    token = _current_budget.set(ContextBudget(tokens) if tokens > 0 else None)
+    try:
+        yield
+    finally:
+        _current_budget.reset(token)
+
+def tool_result(value) -> str:
+    """
+    Serialized tool result, trimmed to what is left of the current ticket's budget.
+    """
+    text = serialize(value)
+    budget = _current_budget.get()
+    return budget.fit(text) if budget is not None else text
+
+def render_steps(prefetched: list[tuple], intermediate_steps: list) -> str:
+    """
+    One line per tool call (`name(args) -> result`) for the structuring pass, instead
+    of the executor's raw step objects and logs. Results are already budgeted.
+    """
+    lines = [f"{name}({serialize(args)}) -> {serialize(output)}" for name, args, output in prefetched]
+    for action, observation in intermediate_steps:
+        lines.append(f"{action.tool}({serialize(action.tool_input)}) -> {serialize(observation)}")
+    return "\n".join(lines)
@@ -0,0 +1,211 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Optional
+from app.locks import interprocess_lock
+
+logger = logging.getLogger(__name__)
+
+# Constants
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+CUSTOMERS_SOURCE = DATA_DIR / "customers.json"
+CUSTOMERS_DB = DATA_DIR / "customers.db"
+
+IMPORT_BATCH_SIZE = 50_000
+# How often (seconds) lookups re-check the source file for changes.
+RELOAD_CHECK_INTERVAL_S = float(os.getenv("CUSTOMER_STORE_RELOAD_INTERVAL", "2.0"))
+# Pages of the DB file mapped into memory (shared with the OS page cache across processes).
+MMAP_SIZE = 1 << 30
+
+def _source_signature(source: Path) -> str:
+    stat = source.stat()
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+def _read_db_signature(db_path: Path) -> Optional[str]:
+    # Source signature recorded in an imported DB file (None if missing or unreadable).
+    if not db_path.exists():
+        return None
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'source_signature'").fetchone()
+        return row[0] if row else None
+    except sqlite3.DatabaseError:
+        return None
+    finally:
+        conn.close()
+
+def _iter_source_records(source: Path):
+    """
+    Yield (customer_id, profile) pairs from either format the importer accepts:
+    - `.json`: one object mapping customer_id -> profile (the mock data format)
+    - `.jsonl`: one profile per line, each carrying its own "customer_id"
+    """
+    if source.suffix == ".jsonl":
+        with open(source, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    profile = json.loads(line)
+                    yield profile.pop("customer_id"), profile
+    else:
+        with open(source, "r", encoding="utf-8") as f:
+            yield from json.load(f).items()
+
+def import_customers(source: Path = CUSTOMERS_SOURCE, db_path: Path = CUSTOMERS_DB) -> int:
+    """
+    Bulk-load customer profiles into the indexed on-disk store.
+
+    The DB is built in a temporary file and atomically renamed over the old one,
+    so readers never observe a half-imported store.
+    """
+    tmp_path = db_path.with_name(f"{db_path.name}.tmp-{os.getpid()}")
+    tmp_path.unlink(missing_ok=True)
+    signature = _source_signature(source)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript("""
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            CREATE TABLE customers (customer_id TEXT PRIMARY KEY, profile TEXT NOT NULL) WITHOUT ROWID;
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        """)
+        count = 0
+        batch = []
+        for customer_id, profile in _iter_source_records(source):
+            batch.append((customer_id, json.dumps(profile, separators=(",", ":"), ensure_ascii=False)))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                conn.executemany("INSERT OR REPLACE INTO customers VALUES (?, ?)", batch)
+                count += len(batch)
+                batch.clear()
+        conn.executemany("INSERT OR REPLACE INTO customers VALUES (?, ?)", batch)
+        count += len(batch)
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("source", str(source)),
+            ("source_signature", signature),
+            ("count", str(count)),
+        ])
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, db_path)
+    logger.info(f"Imported {count} customer profiles into {db_path}")
+    return count
+
+class CustomerStore:
+    """
+    Read path for customer profiles: primary-key lookups against a memory-mapped
+    SQLite file, one read-only connection per thread.
+
+    The store follows its JSON source: when the source changes on disk it is
+    re-imported in the background, and when the DB file is replaced (by this or
+    another process) connections are reopened on the next lookup. Lookups keep
+    using the previous version until then, so no restart or pause is needed.
+    """
+
+    def __init__(self, source: Path = CUSTOMERS_SOURCE, db_path: Path = CUSTOMERS_DB):
+        self.source = source
+        self.db_path = db_path
+        self._local = threading.local()
+        self._reload_lock = threading.Lock()
+        self._importing = False
+        self._generation = 0
+        self._db_inode = None
+        self._db_signature = None
+        self._next_check = 0.0
+
+        self._open_db_file()
+        if self.source.exists() and self._db_signature != _source_signature(self.source):
+            self._import_if_stale()
+            self._open_db_file()
+        self._next_check = time.monotonic() + RELOAD_CHECK_INTERVAL_S
+
+    def _open_db_file(self):
+        """
+        Point new lookups at the current DB file if it was replaced since we last looked.
+        """
+        inode = self.db_path.stat().st_ino if self.db_path.exists() else None
+        if inode == self._db_inode:
+            return
+        self._db_inode = inode
+        self._db_signature = _read_db_signature(self.db_path) if inode is not None else None
+        self._generation += 1
+
+    def _import_if_stale(self):
+        # Every worker process notices a changed source; the first one imports it and
+        # the others, once they get the lock, find the DB already current.
+        with interprocess_lock(self.db_path.with_name(f"{self.db_path.name}.lock")):
+            if _read_db_signature(self.db_path) != _source_signature(self.source):
+                import_customers(self.source, self.db_path)
+
+    def _reimport(self):
+        try:
+            logger.info(f"Customer source {self.source.name} changed. Re-importing...")
+            self._import_if_stale()
+        except Exception as e:
+            logger.error(f"Customer re-import failed: {e}")
+        finally:
+            with self._reload_lock:
+                self._importing = False
+                self._open_db_file()
+
+    def _check_for_changes(self):
+        # Only one thread checks at a time; the others keep serving lookups.
+        if not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_check = time.monotonic() + RELOAD_CHECK_INTERVAL_S
+            self._open_db_file()
+            if self._importing or not self.source.exists():
+                return
+            if _source_signature(self.source) != self._db_signature:
+                self._importing = True
+                threading.Thread(target=self._reimport, name="customer-reimport", daemon=True).start()
+        finally:
+            self._reload_lock.release()
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, "generation", None) != self._generation:
+            if getattr(local, "conn", None) is not None:
+                local.conn.close()
+            local.conn = None
+            if self.db_path.exists():
+                local.conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+                local.conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+            local.generation = self._generation
+        return local.conn
+
+    def get(self, customer_id: str):
+        """
+        Return the profile dict for `customer_id`, or None if it is unknown.
+        Raises FileNotFoundError when there is neither a source nor an imported store.
+        """
+        if time.monotonic() >= self._next_check:
+            self._check_for_changes()
+        conn = self._connection()
+        if conn is None:
+            raise FileNotFoundError(str(self.source))
+        row = conn.execute("SELECT profile FROM customers WHERE customer_id = ?", (customer_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def __len__(self) -> int:
+        conn = self._connection()
+        return conn.execute("SELECT COUNT(*) FROM customers").fetchone()[0] if conn else 0
+
+# Process-wide store (Lazy Loading)
+_store = None
+_store_lock = threading.Lock()
+
+def get_customer_store() -> CustomerStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = CustomerStore()
+    return _store
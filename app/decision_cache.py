@@ -0,0 +1,211 @@
+import os
+import re
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Awaitable, Callable, Optional
+from app.cache import TTLCache
+from app.models import TicketResolution
+
+logger = logging.getLogger(__name__)
+
+DECISION_CACHE_ENABLED = os.getenv("DECISION_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Max (plan, region, status) buckets kept, and max remembered tickets per bucket.
+DECISION_CACHE_MAX_BUCKETS = int(os.getenv("DECISION_CACHE_MAX_BUCKETS", "256"))
+DECISION_CACHE_BUCKET_SIZE = int(os.getenv("DECISION_CACHE_BUCKET_SIZE", "16"))
+DECISION_CACHE_TTL_S = float(os.getenv("DECISION_CACHE_TTL_S", "300"))
+# Minimum Jaccard similarity of message word sets to reuse a decision.
+DECISION_CACHE_SIMILARITY = float(os.getenv("DECISION_CACHE_SIMILARITY", "0.6"))
+# Only these decisions are reused, and only while the customer's region is in an
+# outage (the incident storm case). Billing decisions depend on dates and amounts
+# (refund windows, current time) and are never reused.
+CACHEABLE_ISSUE_TYPES = frozenset({"Technical"})
+
+# Stands in for the customer name inside cached texts.
+NAME_PLACEHOLDER = "\x00customer_name\x00"
+
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have i im is it its me my of on or our so "
+    "that the this to us was we with you your please hi hello thanks thank".split()
+)
+
+# Words that flip a message's meaning ("charged twice" vs "not charged").
+_NEGATIONS = frozenset("not no never none nothing nobody neither nor cannot without".split())
+_WORD = re.compile(r"[a-z0-9]+(?:['\u2019]t\b)?")
+
+def message_signature(message: str) -> frozenset:
+    """
+    Normalized content words of a message, used for near-duplicate matching.
+    """
+    words = _WORD.findall(message.lower())
+    return frozenset(w for w in words if w not in _STOPWORDS)
+
+def _guard_tokens(signature: frozenset) -> frozenset:
+    """
+    Numbers and negations of a message: two messages only match if these are identical
+    ("3 days ago" vs "30 days ago", "charged twice" vs "not charged").
+    """
+    return frozenset(
+        w for w in signature
+        if any(c.isdigit() for c in w) or w in _NEGATIONS or w.endswith(("'t", "\u2019t"))
+    )
+
+def _similarity(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+class DecisionCache:
+    """
+    Reuses triage decisions across near-identical tickets (e.g. incident storms).
+
+    Entries are bucketed by (plan, region key, region status); within a bucket a
+    ticket hits when its message is similar enough to a cached one and has the
+    same numbers and negations. Only Technical decisions taken during a regional
+    outage are kept (see `applies` and CACHEABLE_ISSUE_TYPES). Concurrent misses
+    for the same message wait for one agent run instead of each starting their
+    own (see `resolve`). The whole
+    cache is dropped whenever the data the decisions were based on changes (the
+    status document or the KB index version).
+    """
+
+    def __init__(
+        self,
+        max_buckets: int = DECISION_CACHE_MAX_BUCKETS,
+        bucket_size: int = DECISION_CACHE_BUCKET_SIZE,
+        ttl_s: float = DECISION_CACHE_TTL_S,
+        similarity: float = DECISION_CACHE_SIMILARITY,
+    ):
+        self.bucket_size = bucket_size
+        self.ttl_s = ttl_s
+        self.similarity = similarity
+        self._buckets = TTLCache(maxsize=max_buckets, ttl_s=ttl_s)
+        self._lock = threading.Lock()
+        self._version = None
+        # (bucket, signature, version) -> future of the template being computed for it
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._version is not None:
+                logger.info("Decision cache invalidated (status or KB changed).")
+            self._buckets.clear()
+            self._version = version
+
+    @staticmethod
+    def applies(region_status: dict) -> bool:
+        """
+        Whether tickets from a region with this status may use the cache at all.
+        """
+        return "outage" in (region_status.get("status") or "")
+
+    def lookup(self, bucket: tuple, message: str, customer_name: str, version) -> Optional[TicketResolution]:
+        signature = message_signature(message)
+        guard = _guard_tokens(signature)
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(version)
+            entries = self._buckets.get(bucket) or ()
+            best, best_score = None, 0.0
+            for created, entry_signature, resolution in entries:
+                if now - created > self.ttl_s or _guard_tokens(entry_signature) != guard:
+                    continue
+                score = _similarity(signature, entry_signature)
+                if score > best_score:
+                    best, best_score = resolution, score
+            if best is None or best_score < self.similarity:
+                self.misses += 1
+                return None
+            self.hits += 1
+        logger.info(f"Decision cache hit | Bucket: {bucket} | Similarity: {best_score:.2f}")
+        return self._personalize(best, customer_name)
+
+    def store(self, bucket: tuple, message: str, customer_name: str, version, resolution: TicketResolution) -> Optional[TicketResolution]:
+        """
+        Remember `resolution` for similar tickets; returns the stored template (None if not cacheable).
+        """
+        if resolution.issue_type not in CACHEABLE_ISSUE_TYPES:
+            return None
+        template = resolution.model_copy(update={
+            "user_response": self._templatize(resolution.user_response, customer_name),
+            "internal_ticket_note": self._templatize(resolution.internal_ticket_note, customer_name),
+        })
+        with self._lock:
+            self._check_version(version)
+            entries = self._buckets.get(bucket)
+            if entries is None:
+                entries = deque(maxlen=self.bucket_size)
+            entries.append((time.monotonic(), message_signature(message), template))
+            self._buckets.set(bucket, entries)
+        return template
+
+    async def resolve(
+        self, bucket: tuple, message: str, customer_name: str, version,
+        compute: Callable[[], Awaitable[TicketResolution]],
+    ) -> tuple[TicketResolution, bool]:
+        """
+        Cached decision, else `compute()` (the agent). Tickets that miss while an
+        identical one (same bucket and content words) is being computed await that
+        run instead of starting their own. Returns (decision, reused).
+        """
+        decision = self.lookup(bucket, message, customer_name, version)
+        if decision is not None:
+            return decision, True
+        key = (bucket, message_signature(message), version)
+        with self._lock:
+            leader = self._inflight.get(key)
+            if leader is None:
+                future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        if leader is not None:
+            # Shielded: a follower giving up must not cancel the shared result.
+            template = await asyncio.shield(leader)
+            if template is not None:
+                with self._lock:
+                    self.coalesced += 1
+                logger.info(f"Decision cache coalesced | Bucket: {bucket}")
+                return self._personalize(template, customer_name), True
+            # The leader failed or its decision is not reusable: decide on our own.
+            return await compute(), False
+
+        template = None
+        try:
+            decision = await compute()
+            template = self.store(bucket, message, customer_name, version, decision)
+            return decision, False
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_result(template)
+
+    @staticmethod
+    def _templatize(text: str, customer_name: str) -> str:
+        return text.replace(customer_name, NAME_PLACEHOLDER) if customer_name else text
+
+    @staticmethod
+    def _personalize(template: TicketResolution, customer_name: str) -> TicketResolution:
+        # Cheap personalization: swap the cached customer's name for this one's.
+        name = customer_name or "there"
+        return template.model_copy(update={
+            "user_response": template.user_response.replace(NAME_PLACEHOLDER, name),
+            "internal_ticket_note": template.internal_ticket_note.replace(NAME_PLACEHOLDER, name),
+            "reasoning_trace": template.reasoning_trace + " (Decision reused from an equivalent recent ticket.)",
+        })
+
+    def stats(self) -> dict:
+        # Coalesced tickets missed the cache but still skipped the agent.
+        lookups = self.hits + self.misses
+        return {
+            "buckets": len(self._buckets),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+# Process-wide cache
+decision_cache = DecisionCache()
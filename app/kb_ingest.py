@@ -0,0 +1,176 @@
+import json
+import hashlib
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+from pathlib import Path
+from typing import Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+# Document types the ingestion pipeline reads from the KB directory.
+SUPPORTED_SUFFIXES = (".pdf", ".md", ".txt")
+
+def discover_documents(kb_dir: Path, extra: tuple = ()) -> list[Path]:
+    """
+    KB source files: any existing `extra` paths plus every supported file under
+    `kb_dir` (recursively), in a stable order.
+    """
+    paths = [path for path in extra if path.exists()]
+    if kb_dir.is_dir():
+        paths.extend(sorted(
+            path for path in kb_dir.rglob("*")
+            if path.is_file() and path.suffix.lower() in SUPPORTED_SUFFIXES and not path.name.startswith(".")
+        ))
+    return paths
+
+def sources_signature(paths: list[Path]) -> str:
+    """
+    Cheap change detector for the document set (paths, sizes, mtimes); no file reads.
+    """
+    parts = []
+    for path in paths:
+        stat = path.stat()
+        parts.append(f"{path}:{stat.st_size}:{stat.st_mtime_ns}")
+    return "|".join(parts)
+
+def load_document(path: Path) -> list[Document]:
+    if path.suffix.lower() == ".pdf":
+        from langchain_community.document_loaders import PyPDFLoader
+        return PyPDFLoader(str(path)).load()
+    return [Document(page_content=path.read_text(encoding="utf-8"), metadata={"source": str(path)})]
+
+def split_documents(paths: list[Path], chunk_size: int, chunk_overlap: int, cache_dir: Optional[Path] = None) -> list[Document]:
+    """
+    Load and split every document. With `cache_dir`, each document's chunks are kept
+    there by (path, content) digest, so only new or changed documents are parsed and
+    split again; cache entries of documents no longer present are removed.
+    """
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks = []
+    used = set()
+    for path in paths:
+        cache_file = None
+        if cache_dir is not None:
+            key = hashlib.sha256(f"{path}:{file_digest(path)}:{chunk_size}:{chunk_overlap}".encode("utf-8")).hexdigest()
+            cache_file = cache_dir / f"{key[:32]}.json"
+            used.add(cache_file.name)
+            if cache_file.exists():
+                with open(cache_file, "r", encoding="utf-8") as f:
+                    chunks.extend(Document(**c) for c in json.load(f))
+                continue
+        splits = text_splitter.split_documents(load_document(path))
+        if cache_file is not None:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(cache_file, "w", encoding="utf-8") as f:
+                json.dump([{"page_content": c.page_content, "metadata": c.metadata} for c in splits], f)
+        chunks.extend(splits)
+    if cache_dir is not None and cache_dir.is_dir():
+        for stale in cache_dir.glob("*.json"):
+            if stale.name not in used:
+                stale.unlink(missing_ok=True)
+    return chunks
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class EmbeddingStore:
+    """
+    Persistent chunk-hash -> vector table (SQLite, float32 blobs) for one embedding
+    model. Shared by every index version and worker process, so a chunk is embedded
+    once for as long as its text is unchanged.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS vectors (hash TEXT PRIMARY KEY, vector BLOB NOT NULL) WITHOUT ROWID")
+        return conn
+
+    def get_many(self, hashes: list[str]) -> dict:
+        found = {}
+        with self._lock, closing(self._connect()) as conn, conn:
+            unique = list(dict.fromkeys(hashes))
+            # Stay under SQLite's bound-parameter limit.
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT hash, vector FROM vectors WHERE hash IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update((h, np.frombuffer(blob, dtype=np.float32).tolist()) for h, blob in rows)
+        return found
+
+    def put_many(self, vectors: dict):
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO vectors VALUES (?, ?)",
+                [(h, np.asarray(v, dtype=np.float32).tobytes()) for h, v in vectors.items()],
+            )
+
+    def retain(self, hashes: set) -> int:
+        """
+        Drop vectors of chunks that no longer exist. Returns how many were dropped.
+        """
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute("CREATE TEMP TABLE keep (hash TEXT PRIMARY KEY)")
+            conn.executemany("INSERT OR IGNORE INTO keep VALUES (?)", [(h,) for h in hashes])
+            return conn.execute("DELETE FROM vectors WHERE hash NOT IN (SELECT hash FROM keep)").rowcount
+
+class IncrementalEmbeddings(Embeddings):
+    """
+    Embeddings wrapper for index builds: document vectors are looked up by chunk hash
+    in an EmbeddingStore and only unseen chunks reach the underlying model.
+    Counts `embedded` and `reused` chunks for the ingestion report. Queries pass through.
+    """
+
+    def __init__(self, underlying: Embeddings, store: EmbeddingStore):
+        self.underlying = underlying
+        self.store = store
+        self.embedded = 0
+        self.reused = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        hashes = [chunk_hash(text) for text in texts]
+        known = self.store.get_many(hashes)
+        missing = {h: text for h, text in zip(hashes, texts) if h not in known}
+        if missing:
+            fresh = dict(zip(missing, self.underlying.embed_documents(list(missing.values()))))
+            self.store.put_many(fresh)
+            known.update(fresh)
+        self.embedded += len(missing)
+        self.reused += len(texts) - len(missing)
+        return [known[h] for h in hashes]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.underlying.embed_query(text)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return await self.underlying.aembed_query(text)
+
+def store_path(index_dir: Path, model: str) -> Path:
+    slug = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in model)
+    return index_dir / f"embeddings-{slug}.db"
+
+def relative_name(path: Path, base: Path) -> str:
+    try:
+        return str(path.relative_to(base))
+    except ValueError:
+        return path.name
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
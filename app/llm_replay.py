@@ -0,0 +1,264 @@
+import os
+import json
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable, RunnableLambda
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Record/replay of model-provider calls (chat model and embeddings), keyed by a hash
+# of the request:
+#   off     every call goes to the provider (default)
+#   record  stored responses are replayed; anything new is sent to the provider and stored
+#   replay  stored responses only, fully offline; a request never seen raises ReplayMiss
+LLM_REPLAY_MODE = os.getenv("LLM_REPLAY_MODE", "off").lower()
+LLM_REPLAY_DB = Path(os.getenv("LLM_REPLAY_DB", BASE_DIR / "data" / "llm_replay.db"))
+
+# Stands in for the API key when replaying without one (the provider is never called).
+REPLAY_API_KEY = "replay-only"
+
+class ReplayMiss(LookupError):
+    """
+    Replay mode met a request that was never recorded.
+    """
+
+def request_key(kind: str, identity: Any, payload: Any) -> str:
+    text = json.dumps([kind, identity, payload], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class ResponseStore:
+    """
+    Request hash -> response blob (SQLite, WAL), safe to share between processes.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value BLOB NOT NULL) WITHOUT ROWID")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._connection().execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, value: bytes):
+        conn = self._connection()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?)", (key, value))
+
+# Process-wide store (Lazy Loading)
+_store: Optional[ResponseStore] = None
+_store_lock = threading.Lock()
+
+def get_response_store() -> ResponseStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ResponseStore(LLM_REPLAY_DB)
+    return _store
+
+def _lookup(store: ResponseStore, mode: str, key: str, what: str) -> Optional[bytes]:
+    value = store.get(key)
+    if value is None and mode == "replay":
+        raise ReplayMiss(f"No recorded response for this {what} request ({key[:12]}); run once with LLM_REPLAY_MODE=record")
+    return value
+
+def _canonical_messages(messages) -> list:
+    """
+    The parts of a conversation the provider's answer depends on. Message ids and
+    response metadata are left out (LangChain fills ids with per-run UUIDs).
+    """
+    canonical = []
+    for message in messages:
+        entry = {"type": message.type, "content": message.content}
+        if getattr(message, "tool_calls", None):
+            entry["tool_calls"] = [{"name": c["name"], "args": c["args"], "id": c.get("id")} for c in message.tool_calls]
+        if getattr(message, "tool_call_id", None):
+            entry["tool_call_id"] = message.tool_call_id
+        canonical.append(entry)
+    return canonical
+
+def _canonical_input(value) -> Any:
+    if isinstance(value, str):
+        return value
+    if hasattr(value, "to_messages"):
+        value = value.to_messages()
+    return _canonical_messages(value) if isinstance(value, list) else str(value)
+
+# Config for the underlying provider call: without it the call inherits the outer run's
+# callbacks, and usage/trace handlers would see every call twice (the wrapper's own run
+# already reports the result, recorded or replayed).
+_UNTRACED = {"callbacks": []}
+
+def _model_identity(model: BaseChatModel) -> dict:
+    return {"type": model._llm_type, **model._identifying_params}
+
+class RecordReplayChatModel(BaseChatModel):
+    """
+    Chat model wrapper that answers from the response store and records whatever
+    the underlying model had to answer (see LLM_REPLAY_MODE). Tool binding and
+    structured output are delegated to the underlying model and become part of the key.
+    """
+
+    underlying: BaseChatModel
+    mode: str = "record"
+    store: Any = None
+    # The underlying model with tools bound, and what was bound (for the key)
+    bound: Optional[Runnable] = None
+    binding: dict = {}
+
+    @property
+    def _llm_type(self) -> str:
+        return f"replay-{self.underlying._llm_type}"
+
+    def bind_tools(self, tools, **kwargs):
+        from langchain_core.utils.function_calling import convert_to_openai_tool
+
+        return self.model_copy(update={
+            "bound": self.underlying.bind_tools(tools, **kwargs),
+            "binding": {"tools": [convert_to_openai_tool(t) for t in tools], **kwargs},
+        })
+
+    def _key(self, messages, stop, kwargs) -> str:
+        return request_key(
+            "chat", {"model": _model_identity(self.underlying), "binding": self.binding},
+            {"messages": _canonical_messages(messages), "stop": stop, "kwargs": kwargs},
+        )
+
+    def _replayed(self, key: str) -> Optional[ChatResult]:
+        value = _lookup(self.store, self.mode, key, "chat")
+        if value is None:
+            return None
+        return ChatResult(generations=[ChatGeneration(message=messages_from_dict([json.loads(value)])[0])])
+
+    def _recorded(self, key: str, message: AIMessage) -> ChatResult:
+        self.store.put(key, json.dumps(message_to_dict(message), ensure_ascii=False).encode("utf-8"))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        key = self._key(messages, stop, kwargs)
+        result = self._replayed(key)
+        if result is None:
+            message = (self.bound or self.underlying).invoke(messages, _UNTRACED, stop=stop, **kwargs)
+            result = self._recorded(key, message)
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        key = self._key(messages, stop, kwargs)
+        result = self._replayed(key)
+        if result is None:
+            message = await (self.bound or self.underlying).ainvoke(messages, _UNTRACED, stop=stop, **kwargs)
+            result = self._recorded(key, message)
+        return result
+
+    def with_structured_output(self, schema, **kwargs):
+        structured = self.underlying.with_structured_output(schema, **kwargs)
+        is_model = isinstance(schema, type) and issubclass(schema, BaseModel)
+        identity = {
+            "model": _model_identity(self.underlying),
+            "schema": schema.model_json_schema() if is_model else schema,
+            "kwargs": kwargs,
+        }
+
+        def replayed(key: str):
+            value = _lookup(self.store, self.mode, key, "structured output")
+            if value is None:
+                return None
+            data = json.loads(value)
+            return schema.model_validate(data) if is_model else data
+
+        def record(key: str, output):
+            data = output.model_dump(mode="json") if isinstance(output, BaseModel) else output
+            self.store.put(key, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+            return output
+
+        def invoke(prompt):
+            key = request_key("structured", identity, _canonical_input(prompt))
+            output = replayed(key)
+            return output if output is not None else record(key, structured.invoke(prompt))
+
+        async def ainvoke(prompt):
+            key = request_key("structured", identity, _canonical_input(prompt))
+            output = replayed(key)
+            return output if output is not None else record(key, await structured.ainvoke(prompt))
+
+        return RunnableLambda(invoke, afunc=ainvoke)
+
+class RecordReplayEmbeddings(Embeddings):
+    """
+    Embeddings wrapper with the same record/replay behaviour; vectors are stored as float32.
+    """
+
+    def __init__(self, underlying: Embeddings, identity: str, store: ResponseStore, mode: str):
+        self.underlying = underlying
+        self.identity = identity
+        self.store = store
+        self.mode = mode
+
+    def _get(self, kind: str, text: str) -> tuple[str, Optional[list[float]]]:
+        key = request_key(kind, self.identity, text)
+        value = _lookup(self.store, self.mode, key, "embedding")
+        return key, None if value is None else np.frombuffer(value, dtype=np.float32).tolist()
+
+    def _put(self, key: str, vector: list[float]) -> list[float]:
+        self.store.put(key, np.asarray(vector, dtype=np.float32).tobytes())
+        return vector
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        found = [self._get("document", text) for text in texts]
+        missing = [i for i, (_, vector) in enumerate(found) if vector is None]
+        vectors = [vector for _, vector in found]
+        if missing:
+            fresh = self.underlying.embed_documents([texts[i] for i in missing])
+            for i, vector in zip(missing, fresh):
+                vectors[i] = self._put(found[i][0], vector)
+        return vectors
+
+    def embed_query(self, text: str) -> list[float]:
+        key, vector = self._get("query", text)
+        return vector if vector is not None else self._put(key, self.underlying.embed_query(text))
+
+    async def aembed_query(self, text: str) -> list[float]:
+        key, vector = self._get("query", text)
+        return vector if vector is not None else self._put(key, await self.underlying.aembed_query(text))
+
+def wrap_chat_model(llm: BaseChatModel) -> BaseChatModel:
+    if LLM_REPLAY_MODE == "off":
+        return llm
+    logger.info(f"LLM calls in {LLM_REPLAY_MODE} mode ({LLM_REPLAY_DB})")
+    return RecordReplayChatModel(underlying=llm, mode=LLM_REPLAY_MODE, store=get_response_store())
+
+def wrap_embeddings(embeddings: Embeddings, identity: str) -> Embeddings:
+    if LLM_REPLAY_MODE == "off":
+        return embeddings
+    return RecordReplayEmbeddings(embeddings, identity, get_response_store(), LLM_REPLAY_MODE)
+
+def provider_api_key() -> Optional[str]:
+    """
+    The configured OpenAI key; in replay mode a placeholder if none is set.
+    """
+    key = os.getenv("OPENAI_API_KEY")
+    if not key and LLM_REPLAY_MODE == "replay":
+        return REPLAY_API_KEY
+    return key
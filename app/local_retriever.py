@@ -0,0 +1,175 @@
+import os
+import re
+import json
+import zlib
+import logging
+from pathlib import Path
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+# Local embedding settings. If LOCAL_EMBEDDING_MODEL names a sentence-transformers
+# model (optional dependency) it is used; otherwise the built-in hashing embedder.
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "hashing")
+HASHING_DIM = 1024
+# Reciprocal-rank-fusion constant used to merge the dense and BM25 rankings.
+RRF_K = 60
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+VECTORS_FILE = "vectors.npy"
+CHUNKS_FILE = "chunks.json"
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+class HashingEmbeddings(Embeddings):
+    """
+    Dependency-free local embedder: word unigrams, word bigrams and character
+    trigrams hashed into a fixed-size, L2-normalized float32 vector.
+    Deterministic and fully in-process (no network, no model download).
+    """
+
+    def __init__(self, dim: int = HASHING_DIM):
+        self.dim = dim
+
+    def _features(self, text: str) -> list[str]:
+        words = tokenize(text)
+        features = list(words)
+        features += [f"{a}_{b}" for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f"#{word}#"
+            features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+        return features
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            h = zlib.crc32(feature.encode("utf-8"))
+            # The top hash bit picks the sign so colliding features tend to cancel out.
+            vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(t).tolist() for t in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text).tolist()
+
+    async def aembed_query(self, text: str) -> list[float]:
+        # Microseconds of hashing; not worth a thread hop.
+        return self.embed_query(text)
+
+def get_local_embeddings() -> Embeddings:
+    if LOCAL_EMBEDDING_MODEL == "hashing":
+        return HashingEmbeddings()
+    # HuggingFaceEmbeddings imports sentence_transformers in its constructor.
+    try:
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+
+        return HuggingFaceEmbeddings(model_name=LOCAL_EMBEDDING_MODEL, encode_kwargs={"normalize_embeddings": True})
+    except ImportError as e:
+        raise ImportError(
+            f"LOCAL_EMBEDDING_MODEL={LOCAL_EMBEDDING_MODEL} requires `sentence-transformers`. "
+            "Install it or unset LOCAL_EMBEDDING_MODEL to use the built-in hashing embedder."
+        ) from e
+
+class BM25Index:
+    """
+    Okapi BM25 over the chunk texts. Postings are stored as NumPy arrays so a
+    query is a handful of vectorized adds into one score array.
+    """
+
+    def __init__(self, texts: list[str], k1: float = BM25_K1, b: float = BM25_B):
+        self.size = len(texts)
+        tokenized = [tokenize(t) for t in texts]
+        lengths = np.array([len(tokens) for tokens in tokenized], dtype=np.float32)
+        avg_length = float(lengths.mean()) if self.size else 0.0
+
+        postings = {}
+        for doc_id, tokens in enumerate(tokenized):
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                postings.setdefault(token, ([], []))
+                postings[token][0].append(doc_id)
+                postings[token][1].append(tf)
+
+        # Precompute each posting's full BM25 contribution; querying is then a gather + add.
+        norm = k1 * (1 - b + b * lengths / avg_length) if avg_length else np.ones_like(lengths)
+        self._postings = {}
+        for token, (doc_ids, tfs) in postings.items():
+            doc_ids = np.array(doc_ids, dtype=np.int32)
+            tfs = np.array(tfs, dtype=np.float32)
+            idf = np.log(1 + (self.size - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            self._postings[token] = (doc_ids, (idf * tfs * (k1 + 1) / (tfs + norm[doc_ids])).astype(np.float32))
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(self.size, dtype=np.float32)
+        for token in set(tokenize(query)):
+            posting = self._postings.get(token)
+            if posting is not None:
+                scores[posting[0]] += posting[1]
+        return scores
+
+def _ranks(scores: np.ndarray) -> np.ndarray:
+    ranks = np.empty(len(scores), dtype=np.float32)
+    ranks[np.argsort(-scores, kind="stable")] = np.arange(len(scores), dtype=np.float32)
+    return ranks
+
+class LocalKnowledgeBase:
+    """
+    Fully in-process hybrid retriever over the KB chunks: cosine similarity
+    against a float32 embedding matrix, fused with BM25 lexical scores via
+    reciprocal rank fusion. Exposes the same `similarity_search` methods the
+    rest of the app uses on the Chroma store.
+    """
+
+    def __init__(self, chunks: list[Document], vectors: np.ndarray, embeddings: Embeddings):
+        self.chunks = chunks
+        self.vectors = vectors
+        self.embeddings = embeddings
+        self.bm25 = BM25Index([c.page_content for c in chunks])
+
+    @classmethod
+    def build(cls, chunks: list[Document], embeddings: Embeddings) -> "LocalKnowledgeBase":
+        vectors = np.asarray(embeddings.embed_documents([c.page_content for c in chunks]), dtype=np.float32)
+        return cls(chunks, vectors, embeddings)
+
+    def save(self, directory: Path):
+        np.save(directory / VECTORS_FILE, self.vectors)
+        with open(directory / CHUNKS_FILE, "w", encoding="utf-8") as f:
+            json.dump([{"page_content": c.page_content, "metadata": c.metadata} for c in self.chunks], f)
+
+    @classmethod
+    def load(cls, directory: Path, embeddings: Embeddings) -> "LocalKnowledgeBase":
+        # Memory-mapped read-only: pages are shared with any other process mapping the same file.
+        vectors = np.load(directory / VECTORS_FILE, mmap_mode="r")
+        with open(directory / CHUNKS_FILE, "r", encoding="utf-8") as f:
+            chunks = [Document(**c) for c in json.load(f)]
+        return cls(chunks, vectors, embeddings)
+
+    def _search(self, query: str, query_vector: list[float], k: int) -> list[Document]:
+        dense = self.vectors @ np.asarray(query_vector, dtype=np.float32)
+        fused = 1.0 / (RRF_K + _ranks(dense)) + 1.0 / (RRF_K + _ranks(self.bm25.scores(query)))
+        k = min(k, len(self.chunks))
+        top = np.argpartition(-fused, k - 1)[:k]
+        top = top[np.argsort(-fused[top], kind="stable")]
+        return [self.chunks[i] for i in top]
+
+    def similarity_search(self, query: str, k: int = 4) -> list[Document]:
+        if not self.chunks:
+            return []
+        return self._search(query, self.embeddings.embed_query(query), k)
+
+    async def asimilarity_search(self, query: str, k: int = 4) -> list[Document]:
+        if not self.chunks:
+            return []
+        # The query embedding may be a model call; scoring is in-memory NumPy work (microseconds).
+        return self._search(query, await self.embeddings.aembed_query(query), k)
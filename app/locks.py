@@ -0,0 +1,27 @@
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process serving only
+    fcntl = None
+
+@contextmanager
+def interprocess_lock(path: Path):
+    """
+    Exclusive advisory lock on `path`, held across processes (e.g. uvicorn workers)
+    for the duration of the block. Used so shared on-disk data is built only once.
+    No-op where `fcntl` is unavailable.
+    """
+    if fcntl is None:
+        yield
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
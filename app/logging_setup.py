@@ -0,0 +1,155 @@
+import os
+import copy
+import json
+import queue
+import random
+import logging
+import datetime
+import logging.handlers
+from pathlib import Path
+from typing import Optional
+
+# LOG_MODE=production: JSON records, written by a background thread through a bounded
+# queue, with sampling. Anything else keeps the readable synchronous console + file setup.
+LOG_MODE = os.getenv("LOG_MODE", "development").lower()
+PRODUCTION = LOG_MODE == "production"
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# Records waiting for the writer thread; beyond this they are dropped (and counted)
+# rather than blocking the request that logged them.
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Sampling rates in [0, 1], e.g. LOG_SAMPLE_LEVELS="DEBUG=0,INFO=0.2" and
+# LOG_SAMPLE_COMPONENTS="app.mock_external_services=0.1,httpx=0". A component matches its
+# logger name and children. ERROR and above are never sampled out.
+LOG_SAMPLE_LEVELS = os.getenv("LOG_SAMPLE_LEVELS", "")
+LOG_SAMPLE_COMPONENTS = os.getenv("LOG_SAMPLE_COMPONENTS", "")
+
+# Attributes every LogRecord has; anything else was passed via `extra=` and goes into the JSON.
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+def _parse_rates(spec: str) -> dict:
+    rates = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, rate = item.split("=", 1)
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: timestamp, level, logger, message, any `extra=` fields
+    and the formatted exception, if there is one.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a random fraction of records per level and per component (logger name prefix);
+    both rates apply. ERROR and CRITICAL always pass.
+    """
+
+    def __init__(self, level_rates: dict, component_rates: dict):
+        super().__init__()
+        self.level_rates = {logging.getLevelName(name.upper()): rate for name, rate in level_rates.items()}
+        # Longest prefix first, so "app.agent.trace" wins over "app.agent".
+        self.component_rates = sorted(component_rates.items(), key=lambda item: -len(item[0]))
+
+    def _component_rate(self, name: str) -> float:
+        for component, rate in self.component_rates:
+            if name == component or name.startswith(component + "."):
+                return rate
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        rate = self.level_rates.get(record.levelno, 1.0) * self._component_rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that never blocks the caller: a full queue drops the record.
+    Formatting is left to the writer thread.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only resolve %-args here (they may reference objects that change later);
+        # JSON encoding and traceback formatting happen on the writer thread.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_configured = False
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[_NonBlockingQueueHandler] = None
+
+def setup_logging(log_file: Path):
+    """
+    Configure the root logger once per process (console + `log_file`).
+    """
+    global _configured, _listener, _queue_handler
+    if _configured:
+        return
+    _configured = True
+
+    if not PRODUCTION:
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format="%(asctime)s - %(levelname)s - %(message)s",
+            handlers=[logging.StreamHandler(), logging.FileHandler(log_file)],
+        )
+        return
+
+    formatter = JsonFormatter()
+    handlers = [logging.StreamHandler(), logging.FileHandler(log_file)]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    _queue_handler = _NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    # Sampled-out records are discarded before they are copied or queued.
+    _queue_handler.addFilter(SamplingFilter(_parse_rates(LOG_SAMPLE_LEVELS), _parse_rates(LOG_SAMPLE_COMPONENTS)))
+    root = logging.getLogger()
+    root.handlers = [_queue_handler]
+    root.setLevel(LOG_LEVEL)
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+def dropped_records() -> int:
+    """
+    Records discarded because the log queue was full (always 0 outside production mode).
+    """
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+def shutdown_logging():
+    """
+    Flush queued records and stop the writer thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
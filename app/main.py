@@ -1,14 +1,26 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+import time
+import asyncio
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from app.agent import run_agent
-from app.models import TicketResolution
-from app.mock_external_services import mock_create_ticket
-from typing import Optional
+from app.agent import get_agent, close_agent
+from app.models import TriageRequest, TriageResponse, BatchTriageRequest
+from app.pipeline import triage, triage_many, triage_events
+from app.decision_cache import decision_cache
+from app.rules import rule_engine
+from app.scheduler import agent_scheduler, SchedulerBusy
+from app.outbox import get_outbox
+from app.rag_service import embedding_cache, retrieval_cache, get_vector_store
+from app.customer_store import get_customer_store
+from app.status_service import get_status_service
+from app import metrics
+from app.logging_setup import setup_logging, shutdown_logging, dropped_records
 import os
+import json
+import math
 import logging
 from pathlib import Path
 
@@ -18,101 +30,233 @@ LOG_DIR = BASE_DIR / "logs"
 if not LOG_DIR.exists():
     LOG_DIR.mkdir()
 
-# Configure basic logging to capture agent activity.
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(LOG_DIR / "agent_activity.log")
-    ]
-)
+# Capture agent activity (JSON through a background writer when LOG_MODE=production).
+setup_logging(LOG_DIR / "agent_activity.log")
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Support Ticket Triage Agent")
+# Upper bound on tickets processed concurrently by one batch request.
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "16"))
 
-# --- Models ---
-class TriageRequest(BaseModel):
-    message: str
-    customer_id: str
+app = FastAPI(title="Support Ticket Triage Agent")
 
-class ExecutionResult(BaseModel):
-    status: str
-    ticket_id: Optional[str] = None
-    message: str
+# --- Metrics ---
+_CACHES = {
+    "decision": decision_cache,
+    "kb_embedding": embedding_cache,
+    "kb_retrieval": retrieval_cache,
+}
+metrics.REGISTRY.gauge(
+    "cache_hit_ratio", "Hit ratio of each in-process cache since startup.", ("cache",),
+    lambda: [((name,), cache.stats()["hit_rate"]) for name, cache in _CACHES.items()],
+)
+metrics.REGISTRY.gauge(
+    "rules_fast_path_ratio", "Share of evaluated tickets resolved by the rule engine.", (),
+    lambda: [((), rule_engine.stats()["fast_path_rate"])],
+)
+metrics.REGISTRY.gauge(
+    "outbox_backlog", "CRM tickets pending or in flight in the outbox.", (),
+    lambda: [((), get_outbox().backlog())],
+)
+metrics.REGISTRY.gauge(
+    "scheduler_tickets", "Agent runs in flight and tickets waiting for a slot.", ("state",),
+    lambda: [
+        (("inflight",), agent_scheduler.stats()["inflight"]),
+        (("queued_interactive",), agent_scheduler.stats()["queued_interactive"]),
+        (("queued_bulk",), agent_scheduler.stats()["queued_bulk"]),
+    ],
+)
+metrics.REGISTRY.gauge(
+    "scheduler_rejected", "Tickets rejected with 429 since startup (queue full or displaced).", (),
+    lambda: [((), agent_scheduler.stats()["rejected"])],
+)
+metrics.REGISTRY.gauge(
+    "log_records_dropped", "Log records dropped because the background log queue was full.", (),
+    lambda: [((), dropped_records())],
+)
 
-class TriageResponse(BaseModel):
-    decision: TicketResolution
-    execution_result: ExecutionResult
+if metrics.METRICS_ENABLED:
+    @app.middleware("http")
+    async def timing_middleware(request: Request, call_next):
+        # Stage timings recorded while handling this request are reported back in a
+        # Server-Timing header (not available on streamed responses: headers go out first).
+        timings = metrics.begin_request()
+        start = time.perf_counter()
+        response = await call_next(request)
+        elapsed = time.perf_counter() - start
+        route = request.scope.get("route")
+        metrics.HTTP_SECONDS.observe(
+            elapsed, route=getattr(route, "path", "unmatched"), method=request.method, status=response.status_code
+        )
+        timings["total"] = elapsed
+        response.headers["Server-Timing"] = metrics.server_timing(timings)
+        return response
 
 # --- Startup ---
-@app.on_event("startup")
-async def startup_event():
-    # Verify API Key
-    if not os.getenv("OPENAI_API_KEY"):
-        logger.warning("OPENAI_API_KEY not found in environment!")
+# Warm-up state reported by /readyz. The server accepts connections as soon as it binds;
+# the KB index, agent runtime and data stores are loaded in the background.
+_warmup = {"ready": False, "error": None, "seconds": None}
+_warmup_task = None
+
+def _warm_up_sync():
     # Pre-load vector store
-    from app.rag_service import get_vector_store
     try:
         get_vector_store()
-        logger.info("Application startup complete. Vector store loaded.")
+        logger.info("Vector store loaded.")
     except Exception as e:
         logger.warning(f"Vector store load failed: {e}")
+    # Build the shared agent runtime once (model client, executor, schema binding)
+    get_agent()
+    logger.info("Agent runtime initialized.")
+    # Open the customer index and read the status document before the first ticket needs them
+    get_customer_store()
+    get_status_service().snapshot()
+
+async def _warm_up():
+    start = time.perf_counter()
+    try:
+        await asyncio.to_thread(_warm_up_sync)
+    except Exception as e:
+        _warmup["error"] = str(e)
+        logger.error(f"Warm-up failed, worker stays not ready: {e}")
+        return
+    _warmup["seconds"] = round(time.perf_counter() - start, 3)
+    _warmup["ready"] = True
+    logger.info(f"Application warm-up complete in {_warmup['seconds']}s.")
+
+@app.on_event("startup")
+async def startup_event():
+    global _warmup_task
+    # Verify API Key
+    if not os.getenv("OPENAI_API_KEY"):
+        logger.warning("OPENAI_API_KEY not found in environment!")
+    _warmup_task = asyncio.create_task(_warm_up())
+    # Background delivery of queued CRM tickets
+    get_outbox().start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if _warmup_task is not None:
+        _warmup_task.cancel()
+    await get_outbox().stop()
+    await close_agent()
+    shutdown_logging()
 
 # --- Endpoints ---
 @app.get("/")
 async def root():
     return {"message": "Support Triage Agent API is running. Go to /docs for Swagger UI."}
 
+@app.get("/healthz")
+async def liveness():
+    """
+    Liveness probe: the process is up and its event loop is responsive.
+    """
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readiness():
+    """
+    Readiness probe: 200 once background warm-up has finished, 503 until then
+    (or if warm-up failed), so traffic is only routed to warm workers.
+    """
+    if _warmup["ready"]:
+        return {"status": "ready", "warmup_seconds": _warmup["seconds"]}
+    status = "failed" if _warmup["error"] else "warming_up"
+    return JSONResponse(status_code=503, content={"status": status, "error": _warmup["error"]})
+
+@app.get("/api/stats")
+async def stats():
+    """
+    Fast-path and cache effectiveness counters (how many agent runs were saved).
+    """
+    return {
+        "rules": rule_engine.stats(),
+        "decision_cache": decision_cache.stats(),
+        "kb_embedding_cache": embedding_cache.stats(),
+        "kb_retrieval_cache": retrieval_cache.stats(),
+        "scheduler": agent_scheduler.stats(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    Prometheus exposition: stage latencies, LLM calls/tokens/cost, cache hit ratios.
+    """
+    # Rendered in a thread: gauge collectors such as outbox_backlog query SQLite.
+    body = await asyncio.to_thread(metrics.REGISTRY.render)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+@app.get("/api/tickets/{ref}")
+async def ticket_delivery_status(ref: str):
+    """
+    CRM delivery status of a ticket reference returned by /api/triage.
+    """
+    ticket = await asyncio.to_thread(get_outbox().get, ref)
+    if ticket is None:
+        raise HTTPException(status_code=404, detail="Unknown ticket reference")
+    return ticket
+
 @app.post("/api/triage", response_model=TriageResponse)
 async def triage_ticket(request: TriageRequest):
     logger.info(f"Received Triage Request | Customer: {request.customer_id}")
     try:
-        # 1. Run Agent
-        decision = run_agent(request.message, request.customer_id)
-        logger.info(f"Agent Decision | Action: {decision.action} | Urgency: {decision.urgency}")
-        logger.info(f"Reasoning: {decision.reasoning_trace}")
-        logger.info(f"Tools Used: {decision.executed_tools}")
-        
-        # 2. Execution Layer: Decide whether to act or just reply.
-        exec_result = ExecutionResult(status="no_action_needed", message="Auto-response handled by Agent.")
-        
-        if decision.action == "escalate_to_human":
-            # Real-world Side Effect: Create a ticket in the external CRM.
-            ticket_id = mock_create_ticket(
-                department=decision.target_department or "Support",
-                priority=decision.urgency,
-                note=decision.internal_ticket_note
-            )
-            exec_result = ExecutionResult(
-                status="ticket_created",
-                ticket_id=ticket_id,
-                message=f"Case escalated to {decision.target_department}."
-            )
-            
-        elif decision.action == "route_to_specialist":
-             # Route to specialized queue (e.g. Tier 2 Support) without immediate escalation.
-            ticket_id = mock_create_ticket(
-                department=decision.target_department or "Support",
-                priority=decision.urgency,
-                note=decision.internal_ticket_note
-            )
-            exec_result = ExecutionResult(
-                status="ticket_routed",
-                ticket_id=ticket_id,
-                message=f"Case routed to {decision.target_department} specialist."
-            )
-
-        # 3. Return the comprehensive result: Decision Analysis + System Actions Taken.
-        return TriageResponse(
-            decision=decision,
-            execution_result=exec_result
-        )
-        
+        return await triage(request.message, request.customer_id)
+    except SchedulerBusy as e:
+        logger.warning(f"Ticket rejected, agent queue full | Customer: {request.customer_id}")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
     except Exception as e:
         logger.error(f"Error processing ticket: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/api/triage/stream")
+async def triage_ticket_stream(request: TriageRequest):
+    """
+    Streaming variant of /api/triage (Server-Sent Events). Emits `tool_start`,
+    `tool_end` and `token` events while the agent works, then `resolution`
+    (TicketResolution) and `execution` (ExecutionResult). A failure is reported
+    as a final `error` event (with `retry_after` seconds when the agent queue is full).
+    """
+    logger.info(f"Received Streaming Triage Request | Customer: {request.customer_id}")
+
+    async def stream():
+        try:
+            async for event, data in triage_events(request.message, request.customer_id):
+                yield _sse(event, data)
+        except SchedulerBusy as e:
+            logger.warning(f"Ticket rejected, agent queue full | Customer: {request.customer_id}")
+            yield _sse("error", {"detail": str(e), "retry_after": math.ceil(e.retry_after)})
+        except Exception as e:
+            logger.error(f"Error processing ticket: {str(e)}")
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        # Disable proxy buffering so events reach the client as they are produced.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/api/triage/batch")
+async def triage_batch(request: BatchTriageRequest):
+    """
+    Triage many tickets with bounded concurrency. Streams one `BatchTriageItem`
+    JSON object per line (NDJSON) as each ticket finishes; a failing ticket is
+    reported in its own line without affecting the others. To resume, resubmit
+    the tickets whose `ticket_id` did not come back with a `result`. Batch tickets
+    wait behind interactive traffic for agent slots rather than being rejected.
+    """
+    concurrency = min(request.concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY)
+    logger.info(f"Received Batch Triage Request | Tickets: {len(request.tickets)} | Concurrency: {concurrency}")
+
+    async def stream():
+        async for item in triage_many(request.tickets, concurrency):
+            yield item.model_dump_json() + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="127.0.0.1", port=8000)
@@ -0,0 +1,171 @@
+import os
+import time
+import threading
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+# Set METRICS_ENABLED=false to turn instrumentation into no-ops.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Latency buckets (seconds): sub-millisecond lookups up to multi-second LLM turns.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+def _labels_text(label_names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(label_names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name: str, documentation: str, label_names: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_labels_text(self.label_names, key)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, label_names: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in self._series.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), series):
+                    cumulative += count
+                    le = 'le="' + str(bound) + '"'
+                    lines.append(f"{self.name}_bucket{_labels_text(self.label_names, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels_text(self.label_names, key)} {series[-1]}")
+                lines.append(f"{self.name}_count{_labels_text(self.label_names, key)} {cumulative}")
+        return lines
+
+class Registry:
+    """
+    Minimal Prometheus registry: counters and histograms updated in-process, plus
+    gauge collectors evaluated at scrape time (e.g. cache hit rates from `stats()`).
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._gauges = []
+
+    def counter(self, name: str, documentation: str, label_names: tuple = ()) -> Counter:
+        metric = Counter(name, documentation, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, label_names: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, documentation: str, label_names: tuple, collect: Callable[[], list[tuple]]):
+        """
+        `collect()` returns [(label_values_tuple, value), ...] and is called on every scrape.
+        """
+        self._gauges.append((name, documentation, label_names, collect))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, documentation, label_names, collect in self._gauges:
+            lines.extend([f"# HELP {name} {documentation}", f"# TYPE {name} gauge"])
+            for key, value in collect():
+                lines.append(f"{name}{_labels_text(label_names, key)} {value}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+# --- Shared metrics ---
+STAGE_SECONDS = REGISTRY.histogram(
+    "triage_stage_seconds", "Latency of each triage stage (agent turns, tools, retrieval, CRM, ...).", ("stage",)
+)
+DECISIONS = REGISTRY.counter("triage_decisions_total", "Ticket decisions by the path that produced them.", ("path",))
+LLM_CALLS = REGISTRY.counter("llm_calls_total", "LLM calls by phase.", ("phase",))
+LLM_CALL_SECONDS = REGISTRY.histogram("llm_call_seconds", "Latency of individual LLM calls.", ("phase",))
+LLM_TOKENS = REGISTRY.counter("llm_tokens_total", "LLM tokens by phase and kind (prompt/completion).", ("phase", "kind"))
+LLM_COST = REGISTRY.counter("llm_cost_usd_total", "Estimated LLM spend in USD.")
+TICKET_TOKENS = REGISTRY.histogram(
+    "ticket_llm_tokens", "LLM tokens used per agent-triaged ticket.", ("kind",), buckets=TOKEN_BUCKETS
+)
+SCHEDULER_WAIT_SECONDS = REGISTRY.histogram(
+    "scheduler_wait_seconds", "Time tickets waited for an agent slot, by scheduling priority.", ("priority",)
+)
+HTTP_SECONDS = REGISTRY.histogram("http_request_seconds", "HTTP request latency.", ("route", "method", "status"))
+
+# --- Per-request stage timings (for the Server-Timing header) ---
+_request_timings: ContextVar[Optional[dict]] = ContextVar("request_timings", default=None)
+
+def begin_request() -> dict:
+    """
+    Start collecting stage timings for the current request (inherited by its tasks and threads).
+    """
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+def record(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+class _Timer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        record(self.stage, time.perf_counter() - self.start)
+
+_NO_TIMER = nullcontext()
+
+def timed(stage: str):
+    """
+    `with timed("stage"):` records the block's latency (a shared no-op when metrics are off).
+    """
+    return _Timer(stage) if METRICS_ENABLED else _NO_TIMER
+
+def server_timing(timings: dict) -> str:
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
@@ -1,25 +1,83 @@
+import os
 import uuid
+import asyncio
 import logging
 import random
 import time
 
 logger = logging.getLogger(__name__)
 
+# Simulated round-trip time of the external CRM API (seconds)
+CRM_LATENCY_S = 0.5
+
+def _new_ticket_id() -> str:
+    # Generate a random Ticket ID
+    return f"TKT-{uuid.uuid4().hex[:6].upper()}"
+
+def _log_ticket(ticket_id: str, department: str, priority: str, note: str):
+    # Log the action (This is the visible "Side Effect"); one record per ticket.
+    logger.info(
+        f"[MOCK CRM API CALL] Created Ticket ID: {ticket_id} | Target Dept: {department} | Priority: {priority}",
+        extra={"ticket_id": ticket_id, "department": department, "priority": priority, "note": note},
+    )
+
 def mock_create_ticket(department: str, priority: str, note: str) -> str:
     """
     Simulates creating a support ticket in an external CRM (e.g., Zendesk, Jira).
     """
-    # Generate a random Ticket ID
-    ticket_id = f"TKT-{uuid.uuid4().hex[:6].upper()}"
-    
+    ticket_id = _new_ticket_id()
+
     # Simulate API Latency
-    time.sleep(0.5) 
-    
-    # Log the action (This is the visible "Side Effect")
-    logger.info(f"--------- [MOCK CRM API CALL] ---------")
-    logger.info(f"Creating Ticket ID: {ticket_id}")
-    logger.info(f"Target Dept: {department} | Priority: {priority}")
-    logger.info(f"Internal Note: {note}")
-    logger.info(f"---------------------------------------")
-    
+    time.sleep(CRM_LATENCY_S)
+
+    _log_ticket(ticket_id, department, priority, note)
     return ticket_id
+
+async def amock_create_ticket(department: str, priority: str, note: str) -> str:
+    """
+    Async CRM client: same contract as `mock_create_ticket`, but waits on the
+    simulated network latency without blocking the event loop.
+    """
+    ticket_id = _new_ticket_id()
+
+    # Simulate API Latency
+    await asyncio.sleep(CRM_LATENCY_S)
+
+    _log_ticket(ticket_id, department, priority, note)
+    return ticket_id
+
+# --- Batch API with idempotency (used by the CRM outbox) ---
+
+# Probability that a simulated batch call fails (to exercise retries locally).
+CRM_FAILURE_RATE = float(os.getenv("MOCK_CRM_FAILURE_RATE", "0"))
+
+class MockCRMError(Exception):
+    pass
+
+# Idempotency key -> ticket ID already created for it (the CRM's dedupe table)
+_created_by_key = {}
+
+async def amock_create_tickets_batch(tickets: list[dict]) -> dict:
+    """
+    Simulates a bulk create endpoint. Each ticket carries an `idempotency_key`;
+    retrying a key returns the ticket created the first time instead of a duplicate.
+    Returns {idempotency_key: ticket_id}.
+    """
+    await asyncio.sleep(CRM_LATENCY_S)
+    fail = random.random() < CRM_FAILURE_RATE
+    # Half the simulated failures happen after the CRM committed (lost response),
+    # which is exactly the case idempotency keys protect against on retry.
+    if fail and random.random() < 0.5:
+        raise MockCRMError("Simulated CRM failure (HTTP 503)")
+
+    created = {}
+    for ticket in tickets:
+        key = ticket["idempotency_key"]
+        if key not in _created_by_key:
+            _created_by_key[key] = _new_ticket_id()
+            _log_ticket(_created_by_key[key], ticket["department"], ticket["priority"], ticket["note"])
+        created[key] = _created_by_key[key]
+
+    if fail:
+        raise MockCRMError("Simulated CRM timeout (response lost after commit)")
+    return created
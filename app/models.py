@@ -1,7 +1,10 @@
 from pydantic import BaseModel, Field
 from typing import Literal, Optional
 
-class TicketResolution(BaseModel):
+class TicketDecision(BaseModel):
+    """
+    The fields the agent decides. Submitted directly by the model on its final turn.
+    """
     urgency: Literal["critical", "high", "medium", "low"] = Field(
         ..., description="The urgency level of the ticket."
     )
@@ -23,9 +26,45 @@ class TicketResolution(BaseModel):
     user_response: str = Field(
         ..., description="FOR USER: A polite, empathetic response addressing the user directly."
     )
+    reasoning_trace: str = Field(
+        ..., description="A concise summary of the logic used to make the decision."
+    )
+
+class TicketResolution(TicketDecision):
     executed_tools: list[str] = Field(
         ..., description="A list of the exact tool names called during the process."
     )
-    reasoning_trace: str = Field(
-        ..., description="A concise summary of the logic used to make the decision."
+
+# --- API Models ---
+class TriageRequest(BaseModel):
+    message: str
+    customer_id: str
+
+class ExecutionResult(BaseModel):
+    status: str
+    ticket_id: Optional[str] = None
+    message: str
+
+class TriageResponse(BaseModel):
+    decision: TicketResolution
+    execution_result: ExecutionResult
+
+class BatchTicket(TriageRequest):
+    ticket_id: Optional[str] = Field(
+        None, description="Caller-supplied ID used to match results and resume a batch. Defaults to the item's position."
     )
+
+class BatchTriageRequest(BaseModel):
+    tickets: list[BatchTicket]
+    concurrency: Optional[int] = Field(
+        None, ge=1, description="Max tickets processed at once (capped by the server limit)."
+    )
+
+class BatchTriageItem(BaseModel):
+    """
+    One line of batch output. Exactly one of `result` / `error` is set, so a failed
+    ticket never aborts the rest of the batch.
+    """
+    ticket_id: str
+    result: Optional[TriageResponse] = None
+    error: Optional[str] = None
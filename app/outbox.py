@@ -0,0 +1,215 @@
+import os
+import time
+import uuid
+import random
+import sqlite3
+import asyncio
+import logging
+from contextlib import closing
+from pathlib import Path
+from typing import Optional
+from app.mock_external_services import amock_create_tickets_batch
+from app.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Constants
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+OUTBOX_DB = Path(os.getenv("OUTBOX_DB", DATA_DIR / "outbox.db"))
+
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", "2"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_POLL_INTERVAL_S = float(os.getenv("OUTBOX_POLL_INTERVAL_S", "0.2"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BACKOFF_BASE_S = 1.0
+OUTBOX_BACKOFF_MAX_S = 300.0
+# A claimed batch not acknowledged within this time (e.g. the worker crashed) is retried.
+OUTBOX_LEASE_S = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    ref TEXT PRIMARY KEY,              -- ticket reference returned to the client; also the CRM idempotency key
+    department TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    note TEXT NOT NULL,
+    status TEXT NOT NULL,              -- pending | in_flight | sent | failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    lease_until REAL,
+    crm_ticket_id TEXT,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+"""
+
+def _backoff_s(attempts: int) -> float:
+    # Exponential backoff with full jitter.
+    return random.uniform(0, min(OUTBOX_BACKOFF_MAX_S, OUTBOX_BACKOFF_BASE_S * 2 ** attempts))
+
+class CRMOutbox:
+    """
+    Durable local outbox for CRM ticket creation.
+
+    `enqueue` commits the ticket to SQLite and returns its reference immediately;
+    background workers push due tickets to the CRM in batches. Failed pushes are
+    retried with backoff, and because every ticket is sent with its reference as
+    the idempotency key, a retry after a lost response never creates a duplicate.
+    Claimed-but-unacknowledged tickets (crashed worker/process) are picked up again
+    when their lease expires.
+    """
+
+    def __init__(self, db_path: Path = OUTBOX_DB):
+        self.db_path = db_path
+        self._workers = []
+        self._wakeup = None
+        self._loop = None
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    # --- Producer side ---
+
+    def enqueue(self, department: str, priority: str, note: str) -> str:
+        ref = f"TKT-{uuid.uuid4().hex[:10].upper()}"
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO outbox (ref, department, priority, note, status, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, 'pending', ?, ?)",
+                (ref, department, priority, note, now, now),
+            )
+        # enqueue may run in a worker thread: wake the consumers through their event loop.
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return ref
+
+    async def aenqueue(self, department: str, priority: str, note: str) -> str:
+        return await asyncio.to_thread(self.enqueue, department, priority, note)
+
+    def get(self, ref: str) -> Optional[dict]:
+        with closing(self._connect()) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute(
+                "SELECT ref, status, attempts, crm_ticket_id, last_error, department, priority FROM outbox WHERE ref = ?",
+                (ref,),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def backlog(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM outbox WHERE status IN ('pending', 'in_flight')").fetchone()[0]
+
+    # --- Consumer side ---
+
+    def _claim_batch(self) -> list[dict]:
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.row_factory = sqlite3.Row
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT ref, department, priority, note, attempts FROM outbox "
+                "WHERE (status = 'pending' AND next_attempt_at <= ?) OR (status = 'in_flight' AND lease_until < ?) "
+                "ORDER BY next_attempt_at LIMIT ?",
+                (now, now, OUTBOX_BATCH_SIZE),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE outbox SET status = 'in_flight', lease_until = ? WHERE ref = ?",
+                [(now + OUTBOX_LEASE_S, row["ref"]) for row in rows],
+            )
+            conn.execute("COMMIT")
+        return [dict(row) for row in rows]
+
+    def _mark_sent(self, created: dict):
+        with closing(self._connect()) as conn:
+            conn.executemany(
+                "UPDATE outbox SET status = 'sent', crm_ticket_id = ?, lease_until = NULL, last_error = NULL WHERE ref = ?",
+                [(ticket_id, ref) for ref, ticket_id in created.items()],
+            )
+
+    def _mark_failed(self, batch: list[dict], error: str):
+        now = time.time()
+        updates = []
+        for item in batch:
+            attempts = item["attempts"] + 1
+            status = "failed" if attempts >= OUTBOX_MAX_ATTEMPTS else "pending"
+            updates.append((status, attempts, now + _backoff_s(attempts), error, item["ref"]))
+        with closing(self._connect()) as conn:
+            conn.executemany(
+                "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, lease_until = NULL, last_error = ? "
+                "WHERE ref = ?",
+                updates,
+            )
+        dead = [u[-1] for u in updates if u[0] == "failed"]
+        if dead:
+            logger.error(f"Outbox: giving up on {len(dead)} ticket(s) after {OUTBOX_MAX_ATTEMPTS} attempts: {dead}")
+
+    async def _push_once(self) -> int:
+        batch = await asyncio.to_thread(self._claim_batch)
+        if not batch:
+            return 0
+        payload = [
+            {"idempotency_key": item["ref"], "department": item["department"], "priority": item["priority"], "note": item["note"]}
+            for item in batch
+        ]
+        try:
+            with timed("crm.batch_push"):
+                created = await amock_create_tickets_batch(payload)
+        except Exception as e:
+            logger.warning(f"Outbox: CRM batch of {len(batch)} failed, will retry: {e}")
+            await asyncio.to_thread(self._mark_failed, batch, str(e))
+            return 0
+        await asyncio.to_thread(self._mark_sent, created)
+        logger.info(f"Outbox: delivered {len(created)} ticket(s) to CRM")
+        return len(created)
+
+    async def _worker(self):
+        while True:
+            try:
+                if await self._push_once():
+                    continue
+            except Exception as e:
+                logger.error(f"Outbox worker error: {e}")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=OUTBOX_POLL_INTERVAL_S)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, workers: int = OUTBOX_WORKERS):
+        if self._workers:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(workers)]
+        logger.info(f"Outbox: started {workers} worker(s)")
+
+    async def drain(self, timeout_s: float = 30.0):
+        """
+        Wait until nothing is pending or in flight (used by batch runs before exit).
+        """
+        deadline = time.monotonic() + timeout_s
+        while await asyncio.to_thread(self.backlog) and time.monotonic() < deadline:
+            await asyncio.sleep(OUTBOX_POLL_INTERVAL_S)
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._loop = None
+
+# Process-wide outbox (Lazy Loading)
+_outbox = None
+
+def get_outbox() -> CRMOutbox:
+    global _outbox
+    if _outbox is None:
+        _outbox = CRMOutbox()
+    return _outbox
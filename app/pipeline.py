@@ -0,0 +1,207 @@
+import os
+import asyncio
+import logging
+from typing import AsyncIterator, Iterable
+from app.agent import arun_agent
+from app.models import TicketResolution, ExecutionResult, TriageResponse, BatchTicket, BatchTriageItem
+from app.mock_external_services import amock_create_ticket
+from app.outbox import get_outbox
+from app.customer_store import get_customer_store
+from app.status_service import get_status_service, resolve_region
+from app.rag_service import get_index_version
+from app.decision_cache import decision_cache, DECISION_CACHE_ENABLED
+from app.rules import rule_engine
+from app.scheduler import agent_scheduler, ticket_priority
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+# When enabled, CRM tickets are written to the durable outbox and delivered in the
+# background; the client gets the ticket reference without waiting for the CRM.
+CRM_OUTBOX_ENABLED = os.getenv("CRM_OUTBOX_ENABLED", "true").lower() in ("1", "true", "yes")
+
+async def _create_ticket(department: str, priority: str, note: str) -> str:
+    if CRM_OUTBOX_ENABLED:
+        with metrics.timed("outbox.enqueue"):
+            return await get_outbox().aenqueue(department=department, priority=priority, note=note)
+    with metrics.timed("crm.create_ticket"):
+        return await amock_create_ticket(department=department, priority=priority, note=note)
+
+async def execute_decision(decision: TicketResolution) -> ExecutionResult:
+    """
+    Execution Layer: Decide whether to act or just reply.
+    """
+    if decision.action == "escalate_to_human":
+        # Real-world Side Effect: Create a ticket in the external CRM.
+        ticket_id = await _create_ticket(
+            department=decision.target_department or "Support",
+            priority=decision.urgency,
+            note=decision.internal_ticket_note
+        )
+        return ExecutionResult(
+            status="ticket_created",
+            ticket_id=ticket_id,
+            message=f"Case escalated to {decision.target_department}."
+        )
+
+    if decision.action == "route_to_specialist":
+        # Route to specialized queue (e.g. Tier 2 Support) without immediate escalation.
+        ticket_id = await _create_ticket(
+            department=decision.target_department or "Support",
+            priority=decision.urgency,
+            note=decision.internal_ticket_note
+        )
+        return ExecutionResult(
+            status="ticket_routed",
+            ticket_id=ticket_id,
+            message=f"Case routed to {decision.target_department} specialist."
+        )
+
+    return ExecutionResult(status="no_action_needed", message="Auto-response handled by Agent.")
+
+def _ticket_context(customer_id: str):
+    """
+    (profile, region_status) for the fast paths, or None when the customer is unknown.
+    Both lookups are in-memory / indexed and take microseconds.
+    """
+    try:
+        profile = get_customer_store().get(customer_id)
+    except FileNotFoundError:
+        return None
+    if not profile:
+        return None
+    region_status = get_status_service().region_status(profile.get("region") or "") or {}
+    return profile, region_status
+
+async def _run_agent(message: str, customer_id: str, on_event, priority: int, bulk: bool) -> TicketResolution:
+    """
+    Agent run behind the admission scheduler (may wait for a slot, or raise SchedulerBusy).
+    """
+    async with agent_scheduler.admit(priority, bulk):
+        return await arun_agent(message, customer_id, on_event)
+
+async def _decide(message: str, customer_id: str, on_event=None, bulk: bool = False) -> TicketResolution:
+    """
+    Cheapest path first: deterministic rules, then (during a regional outage) a
+    cached decision for a near-identical recent ticket, then the Agent (awaited so other tickets keep
+    flowing on this worker; scheduled by plan and region status when busy).
+    """
+    with metrics.timed("triage.context"):
+        context = _ticket_context(customer_id)
+    if context is None:
+        metrics.DECISIONS.inc(path="agent")
+        return await _run_agent(message, customer_id, on_event, ticket_priority(None, None), bulk)
+    profile, region_status = context
+    priority = ticket_priority(profile, region_status)
+
+    rule_decision = rule_engine.evaluate(profile, region_status, message)
+    if rule_decision is not None and rule_engine.mode == "on":
+        logger.info("Decision resolved by rule engine (no LLM call).")
+        metrics.DECISIONS.inc(path="rules")
+        return rule_decision
+
+    if DECISION_CACHE_ENABLED and decision_cache.applies(region_status):
+        bucket = (profile.get("plan"), resolve_region(profile.get("region") or ""), region_status.get("status"))
+        version = (get_status_service().version, get_index_version())
+        customer_name = profile.get("name", "")
+        decision, reused = await decision_cache.resolve(
+            bucket, message, customer_name, version,
+            lambda: _run_agent(message, customer_id, on_event, priority, bulk),
+        )
+        metrics.DECISIONS.inc(path="decision_cache" if reused else "agent")
+    else:
+        metrics.DECISIONS.inc(path="agent")
+        decision = await _run_agent(message, customer_id, on_event, priority, bulk)
+
+    if rule_decision is not None:
+        rule_engine.record_shadow(rule_decision, decision)
+    return decision
+
+async def triage(message: str, customer_id: str, on_event=None, bulk: bool = False) -> TriageResponse:
+    """
+    Full triage of one ticket: decision followed by its side effects.
+    `on_event(event, data)`, if given, is called as the ticket progresses (see `triage_events`).
+    `bulk` tickets queue behind interactive ones for an agent slot instead of being rejected.
+    """
+    # 1. Decide (rules / decision cache / Agent)
+    with metrics.timed("triage.decide"):
+        decision = await _decide(message, customer_id, on_event, bulk)
+    logger.info(f"Agent Decision | Action: {decision.action} | Urgency: {decision.urgency}")
+    logger.info(f"Reasoning: {decision.reasoning_trace}")
+    logger.info(f"Tools Used: {decision.executed_tools}")
+
+    if on_event is not None:
+        on_event("resolution", decision.model_dump())
+
+    # 2. Execution Layer
+    with metrics.timed("triage.execute"):
+        exec_result = await execute_decision(decision)
+    if on_event is not None:
+        on_event("execution", exec_result.model_dump())
+
+    # 3. Return the comprehensive result: Decision Analysis + System Actions Taken.
+    return TriageResponse(decision=decision, execution_result=exec_result)
+
+async def triage_events(message: str, customer_id: str) -> AsyncIterator[tuple[str, dict]]:
+    """
+    Streaming triage. Yields `(event, data)` pairs as the ticket progresses:
+
+    - `tool_start` / `tool_end`: agent tool progress (prefetched lookups arrive as `tool_end`)
+    - `token`: `user_response` text while the model is writing it
+    - `resolution`: the full TicketResolution, sent before the CRM write
+    - `execution`: the ExecutionResult
+
+    Fast paths (rules, decision cache) go straight to `resolution`. Token text is a
+    preview; `resolution.user_response` is authoritative. Errors are raised to the caller.
+    """
+    queue = asyncio.Queue()
+    task = asyncio.create_task(triage(message, customer_id, on_event=lambda event, data: queue.put_nowait((event, data))))
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+    try:
+        while (item := await queue.get()) is not None:
+            yield item
+        task.result()
+    finally:
+        # Client went away mid-stream: stop working on the ticket.
+        task.cancel()
+
+async def _triage_item(ticket: BatchTicket) -> BatchTriageItem:
+    try:
+        result = await triage(ticket.message, ticket.customer_id, bulk=True)
+        return BatchTriageItem(ticket_id=ticket.ticket_id, result=result)
+    except Exception as e:
+        logger.error(f"Error processing ticket {ticket.ticket_id}: {str(e)}")
+        return BatchTriageItem(ticket_id=ticket.ticket_id, error=str(e))
+
+async def triage_many(tickets: Iterable[BatchTicket], concurrency: int) -> AsyncIterator[BatchTriageItem]:
+    """
+    Triage a stream of tickets with at most `concurrency` in flight, yielding each
+    result as soon as it finishes (completion order, not input order).
+
+    Input is pulled lazily, so arbitrarily long batches run in bounded memory.
+    Each ticket gets a `ticket_id` (its position if the caller supplied none).
+    """
+    pending = set()
+    tickets = iter(tickets)
+    position = 0
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < concurrency:
+                ticket = next(tickets, None)
+                if ticket is None:
+                    exhausted = True
+                    break
+                if ticket.ticket_id is None:
+                    ticket = ticket.model_copy(update={"ticket_id": str(position)})
+                position += 1
+                pending.add(asyncio.create_task(_triage_item(ticket)))
+            if not pending:
+                return
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        # Consumer went away (e.g. client disconnected): don't leave tickets running.
+        for task in pending:
+            task.cancel()
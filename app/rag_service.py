@@ -1,13 +1,27 @@
 import os
+import json
+import asyncio
+import shutil
+import hashlib
 import logging
+import threading
+import time
 from pathlib import Path
-from langchain_community.document_loaders import PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
+from typing import NamedTuple, Optional
+from langchain_core.embeddings import Embeddings
+from langchain_core.documents import Document
+from app.cache import TTLCache
+from app.metrics import timed
+from app.locks import interprocess_lock
+from app.llm_replay import wrap_embeddings, provider_api_key
+from app.local_retriever import LocalKnowledgeBase, get_local_embeddings, LOCAL_EMBEDDING_MODEL
+from app.kb_ingest import (
+    discover_documents, sources_signature, split_documents, chunk_hash, file_digest, relative_name,
+    EmbeddingStore, IncrementalEmbeddings, store_path,
+)
 
-# Import the data generation script
-from scripts.setup_mock_data import generate_all_mock_data
+# PDF parsing, Chroma, the OpenAI client and the mock-data generator (ReportLab) are
+# imported where they are used, so importing this module stays cheap at startup.
 
 logger = logging.getLogger(__name__)
 
@@ -15,29 +29,326 @@ logger = logging.getLogger(__name__)
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 PDF_PATH = DATA_DIR / "knowledge_base.pdf"
+# Directory of additional KB documents (.pdf, .md, .txt), ingested alongside PDF_PATH.
+KB_DIR = Path(os.getenv("KB_DIR", DATA_DIR / "kb"))
+INDEX_DIR = Path(os.getenv("KB_INDEX_DIR", DATA_DIR / "index"))
+MANIFEST_NAME = "manifest.json"
+# Per-document chunk cache: unchanged documents are not parsed or split again.
+SPLIT_CACHE_DIR = INDEX_DIR / "splits"
+BUILD_LOCK = INDEX_DIR / ".build.lock"
 
-def get_vector_store():
-    # 1. Ensure all mock data exists
+COLLECTION_NAME = "support_kb"
+EMBEDDING_MODEL = "text-embedding-3-small"
+CHUNK_SIZE = 300
+CHUNK_OVERLAP = 50
+
+# How often (seconds) retrieval re-checks the KB documents for changes (0 disables watching).
+KB_WATCH_INTERVAL_S = float(os.getenv("KB_WATCH_INTERVAL_S", "5.0"))
+# Index versions kept on disk: the current one plus its predecessor, which workers
+# that have not swapped yet may still be reading.
+KB_KEEP_VERSIONS = 2
+
+# Retrieval backend: "chroma" (OpenAI embeddings + Chroma) or "local"
+# (in-process embeddings + NumPy/BM25 hybrid, no network; see local_retriever).
+KB_BACKEND = os.getenv("KB_BACKEND", "chroma").lower()
+
+# Query-side caches: repeated KB lookups cost no embedding round-trip and no vector search.
+# Retrieval results are keyed by index version, so a swapped-in index never serves stale hits.
+QUERY_CACHE_SIZE = int(os.getenv("KB_QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL_S = float(os.getenv("KB_QUERY_CACHE_TTL_S", "3600"))
+embedding_cache = TTLCache(maxsize=QUERY_CACHE_SIZE, ttl_s=QUERY_CACHE_TTL_S)
+retrieval_cache = TTLCache(maxsize=QUERY_CACHE_SIZE, ttl_s=QUERY_CACHE_TTL_S)
+
+class _ActiveIndex(NamedTuple):
+    vectorstore: object
+    key: str
+
+# Process-wide index shared by startup and the tools (Lazy Loading). The store and
+# its version key are swapped together as one reference, so a reader never pairs
+# the new key with the old store.
+_active: Optional[_ActiveIndex] = None
+_active_lock = threading.Lock()
+
+# Change detection for hot swaps (see get_vector_store)
+_watch_lock = threading.Lock()
+_sources_signature = None
+_next_check = 0.0
+_ingesting = False
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that memoizes query vectors by normalized query text (the
+    first spelling seen is what gets embedded). Document embedding (index builds) passes straight through.
+    """
+
+    def __init__(self, underlying: Embeddings, cache: TTLCache):
+        self.underlying = underlying
+        self.cache = cache
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.underlying.embed_documents(texts)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await self.underlying.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        key = normalize_query(text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.underlying.embed_query(text)
+            self.cache.set(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> list[float]:
+        key = normalize_query(text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = await self.underlying.aembed_query(text)
+            self.cache.set(key, vector)
+        return vector
+
+def kb_documents() -> list[Path]:
+    return discover_documents(KB_DIR, extra=(PDF_PATH,))
+
+def _embedding_model(backend: str) -> str:
+    return LOCAL_EMBEDDING_MODEL if backend == "local" else EMBEDDING_MODEL
+
+def compute_index_key(backend: str = KB_BACKEND, paths: Optional[list[Path]] = None) -> str:
+    """
+    Fingerprint of everything that shapes the index: every source document's name
+    and bytes plus the backend, splitter and embedding settings. Any change produces a new key.
+    """
+    settings = {
+        "backend": backend,
+        "collection": COLLECTION_NAME,
+        "embedding_model": _embedding_model(backend),
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+    }
+    digest = hashlib.sha256()
+    for path in kb_documents() if paths is None else paths:
+        digest.update(relative_name(path, DATA_DIR).encode("utf-8"))
+        digest.update(file_digest(path).encode("utf-8"))
+    digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    return f"{backend}-{digest.hexdigest()[:16]}"
+
+def load_splits(paths: Optional[list[Path]] = None, cache_dir: Optional[Path] = None) -> list[Document]:
+    return split_documents(kb_documents() if paths is None else paths, CHUNK_SIZE, CHUNK_OVERLAP, cache_dir)
+
+def _create_embeddings(backend: str) -> Embeddings:
+    if backend == "local":
+        return get_local_embeddings()
+    from langchain_openai import OpenAIEmbeddings
+    # Provider calls are recorded / replayed when LLM_REPLAY_MODE is set.
+    return wrap_embeddings(OpenAIEmbeddings(model=EMBEDDING_MODEL, api_key=provider_api_key()), EMBEDDING_MODEL)
+
+def _build_index(persist_dir: Path, embeddings: IncrementalEmbeddings, backend: str, paths: list[Path]):
+    """
+    Build a new index version. Chunk vectors come from the shared embedding store;
+    only chunks whose text is new are sent to the embedding model.
+    """
+    start = time.perf_counter()
+    splits = load_splits(paths, cache_dir=SPLIT_CACHE_DIR)
+    query_embeddings = CachedQueryEmbeddings(embeddings, embedding_cache)
+
+    if backend == "local":
+        vectorstore = LocalKnowledgeBase.build(splits, query_embeddings)
+        vectorstore.save(persist_dir)
+    else:
+        from langchain_community.vectorstores import Chroma
+        vectorstore = Chroma.from_documents(
+            documents=splits,
+            embedding=query_embeddings,
+            collection_name=COLLECTION_NAME,
+            persist_directory=str(persist_dir),
+        )
+    removed = embeddings.store.retain({chunk_hash(split.page_content) for split in splits})
+    seconds = time.perf_counter() - start
+
+    # The manifest is written last: an index directory without one is a partial build.
+    manifest = {
+        "sources": [relative_name(path, DATA_DIR) for path in paths],
+        "backend": backend,
+        "chunks": len(splits),
+        "embedded": embeddings.embedded,
+        "reused": embeddings.reused,
+        "removed": removed,
+        "ingest_seconds": round(seconds, 3),
+    }
+    with open(persist_dir / MANIFEST_NAME, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4)
+    logger.info(
+        f"Built KB index at {persist_dir} ({len(splits)} chunks: {embeddings.embedded} embedded, "
+        f"{embeddings.reused} reused, {removed} removed) in {seconds:.2f}s"
+    )
+    return vectorstore
+
+def _open_index(persist_dir: Path, embeddings, backend: str):
+    logger.info(f"Loading persisted KB index from {persist_dir}")
+    embeddings = CachedQueryEmbeddings(embeddings, embedding_cache)
+    if backend == "local":
+        return LocalKnowledgeBase.load(persist_dir, embeddings)
+    from langchain_community.vectorstores import Chroma
+    return Chroma(
+        collection_name=COLLECTION_NAME,
+        embedding_function=embeddings,
+        persist_directory=str(persist_dir),
+    )
+
+def _prune_stale_indexes(keep: Path, backend: str):
+    versions = sorted(
+        (path for path in INDEX_DIR.iterdir() if path.is_dir() and path != keep and path.name.startswith(f"{backend}-")),
+        key=lambda path: path.stat().st_mtime,
+        reverse=True,
+    )
+    for path in versions[KB_KEEP_VERSIONS - 1:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+def _ensure_mock_data():
     if not PDF_PATH.exists() or not (DATA_DIR / "customers.json").exists():
         logger.warning("Mock Data missing. Running generation script...")
+        from scripts.setup_mock_data import generate_all_mock_data
         generate_all_mock_data()
-    
-    # 2. Setup Embeddings
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-    
-    # 3. Ingest (In-memory/Simulated for this exercise)
-    # Note: iterating directly to loading for simplicity in this stateless example
-    
-    loader = PyPDFLoader(str(PDF_PATH))
-    docs = loader.load()
-    
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=300, chunk_overlap=50)
-    splits = text_splitter.split_documents(docs)
-    
-    vectorstore = Chroma.from_documents(
-        documents=splits, 
-        embedding=embeddings,
-        collection_name="support_kb"
+
+def _load_index(backend: str) -> tuple:
+    """
+    (vectorstore, index key, sources signature) for the current KB documents.
+    """
+    # 1. Ensure all mock data exists
+    _ensure_mock_data()
+
+    # 2. Identify the document set (signature first: a file changing mid-build is caught next check)
+    paths = kb_documents()
+    signature = sources_signature(paths)
+    key = compute_index_key(backend, paths)
+    persist_dir = INDEX_DIR / key
+    embeddings = IncrementalEmbeddings(
+        _create_embeddings(backend), EmbeddingStore(store_path(INDEX_DIR, _embedding_model(backend)))
     )
-    
+
+    # 3. Warm start: reuse the on-disk index when its key matches (no embedding calls)
+    if (persist_dir / MANIFEST_NAME).exists():
+        return _open_index(persist_dir, embeddings, backend), key, signature
+
+    # 4. New version: drop any partial build and embed only new chunks. Worker processes
+    # noticing the change together wait for whichever builds first, then open its index.
+    with interprocess_lock(BUILD_LOCK):
+        if (persist_dir / MANIFEST_NAME).exists():
+            return _open_index(persist_dir, embeddings, backend), key, signature
+        if persist_dir.exists():
+            shutil.rmtree(persist_dir)
+        persist_dir.mkdir(parents=True)
+        with timed("kb.ingest"):
+            vectorstore = _build_index(persist_dir, embeddings, backend, paths)
+        _prune_stale_indexes(keep=persist_dir, backend=backend)
+    return vectorstore, key, signature
+
+def load_vector_store(backend: str = KB_BACKEND):
+    """
+    Open the persisted index for the current KB documents, building a new version
+    (incrementally) only when no complete index exists for their content hash.
+    """
+    vectorstore, _, _ = _load_index(backend)
     return vectorstore
+
+def _install(vectorstore, key: str, signature: Optional[str]):
+    global _active, _sources_signature, _next_check
+    _active = _ActiveIndex(vectorstore, key)
+    _sources_signature = signature
+    _next_check = time.monotonic() + KB_WATCH_INTERVAL_S
+
+def _reingest():
+    global _ingesting
+    try:
+        logger.info("KB documents changed. Ingesting new index version...")
+        vectorstore, key, signature = _load_index(KB_BACKEND)
+        # Hot swap: in-flight searches finish on the old index, new ones use this one.
+        _install(vectorstore, key, signature)
+        logger.info(f"Now serving KB index {key}")
+    except Exception as e:
+        logger.error(f"KB ingestion failed, still serving {get_index_version()}: {e}")
+    finally:
+        with _watch_lock:
+            _ingesting = False
+
+def _check_for_changes():
+    global _next_check, _ingesting
+    # Only one thread checks at a time; the others keep searching the current index.
+    if not _watch_lock.acquire(blocking=False):
+        return
+    try:
+        _next_check = time.monotonic() + KB_WATCH_INTERVAL_S
+        if _ingesting or _sources_signature is None:
+            return
+        if sources_signature(kb_documents()) != _sources_signature:
+            _ingesting = True
+            threading.Thread(target=_reingest, name="kb-ingest", daemon=True).start()
+    finally:
+        _watch_lock.release()
+
+def _get_active() -> _ActiveIndex:
+    if _active is None:
+        with _active_lock:
+            if _active is None:
+                with timed("kb.load"):
+                    _install(*_load_index(KB_BACKEND))
+    elif KB_WATCH_INTERVAL_S > 0 and time.monotonic() >= _next_check:
+        _check_for_changes()
+    return _active
+
+def get_vector_store():
+    """
+    Return the process-wide vector store (Chroma or LocalKnowledgeBase, per
+    KB_BACKEND), loading it on first use. When the KB documents change on disk,
+    a new version is ingested in the background and swapped in without pausing searches.
+    """
+    return _get_active().vectorstore
+
+def init_vector_store(embeddings: Embeddings) -> LocalKnowledgeBase:
+    """
+    Serve an in-memory local index built with `embeddings` instead of the persisted
+    index (benchmarks and offline runs; nothing is written to disk, no watching).
+    """
+    _ensure_mock_data()
+    embedding_cache.clear()
+    retrieval_cache.clear()
+    with _active_lock:
+        vectorstore = LocalKnowledgeBase.build(load_splits(), CachedQueryEmbeddings(embeddings, embedding_cache))
+        _install(vectorstore, f"memory-{id(vectorstore):x}", None)
+    return vectorstore
+
+def search(query: str, k: int = 3) -> list[Document]:
+    """
+    Top-k KB chunks for `query`, served from the retrieval cache when possible.
+    """
+    active = _get_active()
+    key = (active.key, normalize_query(query), k)
+    docs = retrieval_cache.get(key)
+    if docs is None:
+        with timed("kb.similarity_search"):
+            docs = active.vectorstore.similarity_search(query, k=k)
+        retrieval_cache.set(key, docs)
+    return docs
+
+async def asearch(query: str, k: int = 3) -> list[Document]:
+    active = _active
+    if active is None or (KB_WATCH_INTERVAL_S > 0 and time.monotonic() >= _next_check):
+        # First load or a change check touches disk: keep it off the event loop.
+        active = await asyncio.to_thread(_get_active)
+    key = (active.key, normalize_query(query), k)
+    docs = retrieval_cache.get(key)
+    if docs is None:
+        with timed("kb.similarity_search"):
+            docs = await active.vectorstore.asimilarity_search(query, k=k)
+        retrieval_cache.set(key, docs)
+    return docs
+
+def get_index_version():
+    """
+    Key of the KB index currently served (None before it is loaded). Caches derived
+    from KB content compare against this to detect a rebuilt index.
+    """
+    return _active.key if _active is not None else None
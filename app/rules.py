@@ -0,0 +1,179 @@
+import os
+import re
+import logging
+import threading
+from typing import Optional
+from app.models import TicketResolution
+
+logger = logging.getLogger(__name__)
+
+# "on": clear-cut tickets are resolved by the rules without the LLM.
+# "shadow": rules are evaluated and compared against the agent, but the agent decides.
+# "off": rules are not evaluated.
+RULES_MODE = os.getenv("RULES_MODE", "on").lower()
+
+# --- Cheap message features ---
+_REFUND = re.compile(r"\b(refunds?|refunded|money back|reimburse\w*|cancel\w* (my )?(subscription|plan))\b", re.I)
+# Bank mentions only count as threats ("call my bank"), not as payment details ("update my bank account").
+_LEGAL = re.compile(
+    r"\b(lawyers?|attorney|legal action|sue|suing|lawsuit|court|chargebacks?"
+    r"|dispute (it |this |the charges? )?with (my|the) bank|(call|calling|contact|contacting|report\w* (it|this) to) (my|the) bank)\b",
+    re.I,
+)
+_OUTAGE = re.compile(
+    r"\b(500|5\d\d errors?|internal server error|outage|(is|are|it's|everything|site|app|service|system) (is )?down"
+    r"|not (loading|working|responding)|can'?t (access|connect|load)|unavailable|crash\w*|timeouts?|timing out)\b",
+    re.I,
+)
+_BILLING = re.compile(r"\b(invoice|charged?|billing|payment|subscription|price|pricing)\b", re.I)
+_FEATURE = re.compile(r"\b(feature|roadmap|would be (nice|great)|please add|can you add|suggest\w*)\b", re.I)
+_FRUSTRATED = re.compile(r"(!{2,}|\b(angry|furious|unacceptable|ridiculous|worst|terrible|asap|immediately)\b)", re.I)
+_NEGATIVE = re.compile(r"\b(not happy|disappointed|annoyed|frustrat\w*|problem|issue|broken)\b", re.I)
+
+def _is_english(message: str) -> bool:
+    # Template replies are English; anything else goes to the agent (it matches the user's language).
+    letters = [c for c in message if c.isalpha()]
+    return bool(letters) and sum(c.isascii() for c in letters) / len(letters) > 0.95
+
+def _sentiment(message: str) -> str:
+    if _FRUSTRATED.search(message):
+        return "frustrated"
+    if _NEGATIVE.search(message):
+        return "negative"
+    return "neutral"
+
+# --- Rules ---
+# Each rule fires only when exactly one intent is present, so mixed tickets
+# (e.g. an outage complaint that also asks for a refund) fall through to the agent.
+
+def _confirmed_outage(profile: dict, region_status: dict, message: str) -> Optional[TicketResolution]:
+    # Only a major outage is CRITICAL; partial outages are graded by plan, so the agent decides.
+    state = region_status.get("status", "")
+    if state != "major_outage" or not _OUTAGE.search(message):
+        return None
+    if _REFUND.search(message) or _LEGAL.search(message):
+        return None
+    plan = profile.get("plan", "unknown")
+    return TicketResolution(
+        urgency="critical",
+        issue_type="Technical",
+        sentiment=_sentiment(message),
+        action="escalate_to_human",
+        target_department="Engineering",
+        internal_ticket_note=(
+            f"User ({plan}) reported service failure. Verified {state} in {profile.get('region')}: "
+            f"{region_status.get('message', '')} Escalating."
+        ),
+        user_response=(
+            "I understand how disruptive this is, and I'm sorry for the trouble. We have confirmed an active "
+            f"service incident affecting your region ({profile.get('region')}). I have escalated your case to our "
+            "Engineering team immediately, and they are investigating. We will keep you updated on progress."
+        ),
+        executed_tools=["get_customer_profile", "check_system_status"],
+        reasoning_trace=(
+            f"System Status for the customer's region is '{state}' (confirmed outage) and the user reports "
+            "matching technical symptoms -> escalate_to_human to Engineering with CRITICAL urgency. [rule: confirmed_outage]"
+        ),
+    )
+
+def _free_plan_refund(profile: dict, region_status: dict, message: str) -> Optional[TicketResolution]:
+    if profile.get("plan") != "free" or not _REFUND.search(message):
+        return None
+    if _LEGAL.search(message) or _OUTAGE.search(message) or _FEATURE.search(message):
+        return None
+    return TicketResolution(
+        urgency="low",
+        issue_type="Billing",
+        sentiment=_sentiment(message),
+        action="auto_respond",
+        target_department=None,
+        internal_ticket_note="User (Free) requested a refund. Free tier has no refunds per policy. Auto-responded.",
+        user_response=(
+            "Thank you for reaching out. Your account is on our Free plan, which does not involve any charges, "
+            "so there is nothing to refund under our refund policy. If you believe you were charged by mistake, "
+            "please reply with the charge details and we will look into it right away."
+        ),
+        executed_tools=["get_customer_profile"],
+        reasoning_trace="Customer Plan is Free and the request is a refund; KB policy: 'Free Tier: No refunds applicable' -> auto_respond (deny politely), LOW urgency. [rule: free_plan_refund]",
+    )
+
+def _billing_legal_threat(profile: dict, region_status: dict, message: str) -> Optional[TicketResolution]:
+    if not _LEGAL.search(message) or not (_BILLING.search(message) or _REFUND.search(message)):
+        return None
+    if _OUTAGE.search(message):
+        return None
+    plan = profile.get("plan", "unknown")
+    return TicketResolution(
+        urgency="high",
+        issue_type="Billing",
+        sentiment=_sentiment(message),
+        action="escalate_to_human",
+        target_department="Billing",
+        internal_ticket_note=f"User ({plan}) raised a billing dispute with legal/bank threat. Escalating to Billing.",
+        user_response=(
+            "I understand this is frustrating, and I want to make sure it is handled properly. I have escalated "
+            "your case to our Billing team immediately, and they will investigate and contact you directly."
+        ),
+        executed_tools=["get_customer_profile"],
+        reasoning_trace="Billing dispute with legal/bank threat -> escalate_to_human to Billing with HIGH urgency. [rule: billing_legal_threat]",
+    )
+
+RULES = [_confirmed_outage, _billing_legal_threat, _free_plan_refund]
+
+class RuleEngine:
+    """
+    Deterministic pre-classifier for the mechanical rows of the decision matrix.
+    Returns a complete TicketResolution for clear-cut tickets, None otherwise.
+    """
+
+    def __init__(self, mode: str = RULES_MODE):
+        self.mode = mode
+        self._lock = threading.Lock()
+        self.evaluated = 0
+        self.matched = {}
+        # Tickets actually resolved by a rule (mode "on"); shadow matches are not fast paths.
+        self.fast_paths = 0
+        self.shadow_compared = 0
+        self.shadow_agreed = 0
+
+    def evaluate(self, profile: dict, region_status: dict, message: str) -> Optional[TicketResolution]:
+        if self.mode == "off":
+            return None
+        with self._lock:
+            self.evaluated += 1
+        if not _is_english(message):
+            return None
+        for rule in RULES:
+            resolution = rule(profile, region_status, message)
+            if resolution is not None:
+                name = rule.__name__.lstrip("_")
+                with self._lock:
+                    self.matched[name] = self.matched.get(name, 0) + 1
+                    self.fast_paths += self.mode == "on"
+                return resolution
+        return None
+
+    def record_shadow(self, rule_decision: TicketResolution, agent_decision: TicketResolution):
+        fields = ("action", "urgency", "target_department")
+        agreed = all(getattr(rule_decision, f) == getattr(agent_decision, f) for f in fields)
+        with self._lock:
+            self.shadow_compared += 1
+            self.shadow_agreed += agreed
+        if not agreed:
+            logger.warning(
+                "Rule/agent disagreement | "
+                + " | ".join(f"{f}: rule={getattr(rule_decision, f)} agent={getattr(agent_decision, f)}" for f in fields)
+            )
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "evaluated": self.evaluated,
+            "matched": dict(self.matched),
+            "fast_path_rate": round(self.fast_paths / self.evaluated, 4) if self.evaluated else 0.0,
+            "shadow_compared": self.shadow_compared,
+            "shadow_agreement_rate": round(self.shadow_agreed / self.shadow_compared, 4) if self.shadow_compared else 0.0,
+        }
+
+# Process-wide engine
+rule_engine = RuleEngine()
@@ -0,0 +1,283 @@
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Optional
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+# Admission control in front of the agent (tickets that need the LLM).
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+# Agent runs allowed at once per worker; each run makes its LLM calls one after another.
+LLM_MAX_INFLIGHT = int(os.getenv("LLM_MAX_INFLIGHT", "32"))
+# Interactive tickets allowed to wait for a slot; beyond this they get 429.
+SCHEDULER_MAX_QUEUE = int(os.getenv("SCHEDULER_MAX_QUEUE", "256"))
+# Provider rate limits for this worker (0 = unlimited): LLM requests and tokens per minute.
+LLM_RPM = int(os.getenv("LLM_RPM", "0"))
+LLM_TPM = int(os.getenv("LLM_TPM", "0"))
+# Reserved per ticket at admission; corrected to the real usage when the ticket finishes.
+EST_CALLS_PER_TICKET = int(os.getenv("EST_CALLS_PER_TICKET", "2"))
+EST_TOKENS_PER_TICKET = int(os.getenv("EST_TOKENS_PER_TICKET", "4000"))
+
+# Lower runs first. Plan sets the base; a degraded region moves its tickets up.
+PLAN_PRIORITY = {"enterprise": 0, "pro": 10, "free": 20}
+UNKNOWN_PRIORITY = 30
+OUTAGE_BOOST = 5
+# Bulk (batch endpoint / CLI) tickets wait behind every interactive one.
+BULK_PRIORITY = 100
+
+def ticket_priority(profile: Optional[dict], region_status: Optional[dict]) -> int:
+    """
+    Cheap priority estimate from data the pipeline already has in memory.
+    """
+    if not profile:
+        return UNKNOWN_PRIORITY
+    priority = PLAN_PRIORITY.get(profile.get("plan"), UNKNOWN_PRIORITY)
+    if (region_status or {}).get("status", "operational") != "operational":
+        priority -= OUTAGE_BOOST
+    return priority
+
+class SchedulerBusy(Exception):
+    """
+    The admission queue is full (or the ticket was displaced by a higher-priority one).
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__("Triage capacity exhausted, retry later")
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """
+    Refills `per_minute` units per minute up to one minute's worth. The level may go
+    negative when actual usage exceeds what was reserved; later takers then wait longer.
+    """
+
+    def __init__(self, per_minute: int):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """
+        Seconds until `amount` can be taken (0 when available now).
+        """
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= amount
+
+class _Grant:
+    __slots__ = ("calls", "tokens")
+
+    def __init__(self):
+        self.calls = 0
+        self.tokens = 0
+
+# LLM usage of the ticket running in this context (reported by the agent's usage callback).
+_current_grant: ContextVar[Optional[_Grant]] = ContextVar("scheduler_grant", default=None)
+
+def record_llm_usage(tokens: int):
+    grant = _current_grant.get()
+    if grant is not None:
+        grant.calls += 1
+        grant.tokens += tokens
+
+class AgentScheduler:
+    """
+    Priority admission for agent runs on one worker's event loop.
+
+    A ticket starts when fewer than `max_inflight` runs are active and the request
+    and token buckets cover its estimated usage; otherwise it waits in a priority
+    queue (plan / region status, then arrival order). When the interactive queue is
+    full, a newcomer that outranks the lowest-priority waiter displaces it; anyone
+    else is rejected with `SchedulerBusy` and a Retry-After estimate. Bulk tickets
+    are never rejected (their caller bounds their concurrency) and always go last.
+    """
+
+    def __init__(
+        self,
+        max_inflight: int = LLM_MAX_INFLIGHT,
+        max_queue: int = SCHEDULER_MAX_QUEUE,
+        rpm: int = LLM_RPM,
+        tpm: int = LLM_TPM,
+        est_calls: int = EST_CALLS_PER_TICKET,
+        est_tokens: int = EST_TOKENS_PER_TICKET,
+    ):
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.est_calls = est_calls
+        self.est_tokens = est_tokens
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        # (priority, seq, future, bulk); entries whose future is done are stale and skipped.
+        self._heap = []
+        self._seq = itertools.count()
+        self._interactive_waiting = 0
+        self._bulk_waiting = 0
+        self._inflight = 0
+        self._timer = None
+        # Moving average of agent run time, for Retry-After.
+        self._service_s = 5.0
+        self._admitted = 0
+        self._rejected = 0
+
+    # --- Capacity ---
+    def _bucket_wait(self) -> float:
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(self.est_calls))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_time(self.est_tokens))
+        return wait
+
+    def _start(self):
+        self._inflight += 1
+        self._admitted += 1
+        if self.requests is not None:
+            self.requests.take(self.est_calls)
+        if self.tokens is not None:
+            self.tokens.take(self.est_tokens)
+
+    def _dispatch(self):
+        """
+        Start queued tickets in priority order while slots and rate budget allow.
+        """
+        self._timer = None
+        while self._heap and self._inflight < self.max_inflight:
+            _, _, future, bulk = self._heap[0]
+            if future.done():
+                heapq.heappop(self._heap)
+                continue
+            wait = self._bucket_wait()
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            heapq.heappop(self._heap)
+            self._dequeued(bulk)
+            self._start()
+            future.set_result(None)
+
+    def _dequeued(self, bulk: bool):
+        if bulk:
+            self._bulk_waiting -= 1
+        else:
+            self._interactive_waiting -= 1
+
+    def retry_after(self) -> float:
+        """
+        Rough seconds until a newly queued interactive ticket would start.
+        """
+        drain = self._service_s * (self._interactive_waiting + 1) / max(self.max_inflight, 1)
+        return max(1.0, drain, self._bucket_wait())
+
+    def _displace_lowest(self, priority: int) -> bool:
+        """
+        Reject the lowest-priority interactive waiter if `priority` outranks it.
+        """
+        lowest = None
+        for entry in self._heap:
+            if not entry[3] and not entry[2].done() and (lowest is None or entry[:2] > lowest[:2]):
+                lowest = entry
+        if lowest is None or lowest[0] <= priority:
+            return False
+        self._interactive_waiting -= 1
+        self._rejected += 1
+        lowest[2].set_exception(SchedulerBusy(self.retry_after()))
+        return True
+
+    # --- Admission ---
+    async def _acquire(self, priority: int, bulk: bool):
+        if not self._heap and self._inflight < self.max_inflight and self._bucket_wait() == 0:
+            self._start()
+            return
+        if not bulk and self._interactive_waiting >= self.max_queue and not self._displace_lowest(priority):
+            self._rejected += 1
+            raise SchedulerBusy(self.retry_after())
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (priority, next(self._seq), future, bulk))
+        if bulk:
+            self._bulk_waiting += 1
+        else:
+            self._interactive_waiting += 1
+        if self._timer is None:
+            self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                if future.exception() is None:
+                    # Started just as the caller gave up: hand the slot on.
+                    self._release(_Grant(), 0.0)
+                # Otherwise it was displaced (already uncounted) and never held a slot.
+            else:
+                future.cancel()
+                self._dequeued(bulk)
+            raise
+
+    def _release(self, grant: _Grant, elapsed: float):
+        self._inflight -= 1
+        # Return what was reserved but not used (or charge the overrun), including the whole
+        # reservation of a run that failed or was cancelled before its first LLM call.
+        if self.requests is not None:
+            self.requests.take(grant.calls - self.est_calls)
+        if self.tokens is not None:
+            self.tokens.take(grant.tokens - self.est_tokens)
+        if elapsed > 0:
+            self._service_s = 0.8 * self._service_s + 0.2 * elapsed
+        if self._timer is None:
+            self._dispatch()
+
+    @asynccontextmanager
+    async def admit(self, priority: int, bulk: bool = False):
+        """
+        `async with agent_scheduler.admit(priority):` around one agent run.
+        Raises SchedulerBusy when the ticket cannot be queued.
+        """
+        if not SCHEDULER_ENABLED:
+            yield
+            return
+        if bulk:
+            priority += BULK_PRIORITY
+        start = time.perf_counter()
+        await self._acquire(priority, bulk)
+        waited = time.perf_counter() - start
+        metrics.record("scheduler.wait", waited)
+        metrics.SCHEDULER_WAIT_SECONDS.observe(waited, priority=priority)
+        grant = _Grant()
+        token = _current_grant.set(grant)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            _current_grant.reset(token)
+            self._release(grant, time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": SCHEDULER_ENABLED,
+            "inflight": self._inflight,
+            "max_inflight": self.max_inflight,
+            "queued_interactive": self._interactive_waiting,
+            "queued_bulk": self._bulk_waiting,
+            "max_queue": self.max_queue,
+            "admitted": self._admitted,
+            "rejected": self._rejected,
+            "avg_run_seconds": round(self._service_s, 3),
+        }
+
+# Global instance (one per worker process)
+agent_scheduler = AgentScheduler()
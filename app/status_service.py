@@ -0,0 +1,166 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Constants
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+SYSTEM_STATUS_PATH = DATA_DIR / "system_status.json"
+
+# Seconds the in-memory status document is trusted before the file is checked for changes.
+STATUS_TTL_S = float(os.getenv("STATUS_TTL_S", "1.0"))
+
+# Internal region key -> the countries, cities and aliases customers use for it.
+REGION_ALIASES = {
+    "us-east": [
+        "us", "usa", "u s", "u s a", "united states", "united states of america", "america", "americas",
+        "north america", "na", "canada", "mexico", "brazil", "argentina", "latam", "latin america",
+        "new york", "virginia", "washington", "boston", "chicago", "california", "san francisco",
+        "los angeles", "seattle", "texas", "toronto", "vancouver", "sao paulo",
+    ],
+    "eu-west": [
+        "eu", "europe", "emea", "uk", "united kingdom", "great britain", "england", "scotland", "ireland",
+        "germany", "france", "spain", "portugal", "italy", "netherlands", "belgium", "switzerland",
+        "austria", "sweden", "norway", "denmark", "finland", "poland", "russia", "ukraine", "turkey",
+        "london", "dublin", "paris", "berlin", "frankfurt", "amsterdam", "madrid", "milan", "stockholm",
+        "moscow", "warsaw", "zurich",
+    ],
+    "asia-pacific": [
+        "asia", "apac", "asia pacific", "asiapacific", "oceania", "thailand", "vietnam", "singapore",
+        "malaysia", "indonesia", "philippines", "japan", "korea", "south korea", "china", "hong kong",
+        "taiwan", "india", "australia", "new zealand", "bangkok", "hanoi", "ho chi minh city",
+        "kuala lumpur", "jakarta", "manila", "tokyo", "seoul", "shanghai", "beijing", "mumbai",
+        "bangalore", "sydney", "melbourne", "auckland",
+    ],
+}
+
+def _normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+# Precomputed lookup: normalized alias (or region key) -> region key.
+REGION_LOOKUP = {
+    _normalize(alias): key
+    for key, aliases in REGION_ALIASES.items()
+    for alias in [key, *aliases]
+}
+_MAX_ALIAS_WORDS = max(len(alias.split()) for alias in REGION_LOOKUP)
+
+@lru_cache(maxsize=4096)
+def resolve_region(region: str) -> Optional[str]:
+    """
+    Map free-form region text ('Thailand', 'Bangkok, TH', 'eu-west') to an internal
+    region key, or None. Matches whole words only, longest phrase first, so
+    'Russia' and 'Australia' no longer match 'us'.
+    """
+    normalized = _normalize(region)
+    key = REGION_LOOKUP.get(normalized)
+    if key:
+        return key
+    words = normalized.split()
+    for size in range(min(_MAX_ALIAS_WORDS, len(words)), 0, -1):
+        for start in range(len(words) - size + 1):
+            key = REGION_LOOKUP.get(" ".join(words[start:start + size]))
+            if key:
+                return key
+    return None
+
+def _format_status(region_status: dict) -> str:
+    state = region_status.get("status", "unknown")
+    msg = region_status.get("message", "No details")
+    if "outage" in state:
+        return f"🔴 {state.upper()}: {msg}"
+    return f"🟢 {state.upper()}: {msg}"
+
+class StatusService:
+    """
+    In-memory view of `system_status.json`. The document and the tool's rendered
+    strings are rebuilt only when the file changes; between TTL checks a status
+    lookup is a couple of dict reads.
+    """
+
+    def __init__(self, path: Path = SYSTEM_STATUS_PATH, ttl_s: float = STATUS_TTL_S):
+        self.path = path
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._signature = None
+        self._next_check = 0.0
+        self.data = None
+        self._rendered = {}
+
+    def _refresh(self):
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_check:
+                return
+            self._next_check = now + self.ttl_s
+            try:
+                stat = self.path.stat()
+            except FileNotFoundError:
+                if self.data is not None:
+                    logger.error("system_status.json not found")
+                self._signature, self.data, self._rendered = None, None, {}
+                return
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if signature == self._signature:
+                return
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._rendered = {key: _format_status(status) for key, status in data.get("regions", {}).items()}
+            self.data = data
+            self._signature = signature
+            logger.info(f"System status loaded (last_updated: {data.get('last_updated', 'unknown')})")
+
+    def snapshot(self) -> Optional[dict]:
+        """
+        The current status document (None if unavailable). Treat as read-only.
+        """
+        if time.monotonic() >= self._next_check:
+            self._refresh()
+        return self.data
+
+    @property
+    def version(self):
+        """
+        Changes whenever a different status document is loaded.
+        """
+        self.snapshot()
+        return self._signature
+
+    def region_status(self, region: str) -> Optional[dict]:
+        data = self.snapshot()
+        key = resolve_region(region)
+        if data is None or key is None:
+            return None
+        return data.get("regions", {}).get(key)
+
+    def describe(self, region: str) -> str:
+        """
+        Human-readable status line for `region`, as returned by the `check_system_status` tool.
+        """
+        data = self.snapshot()
+        if data is None:
+            return "Error: System status data unavailable."
+        rendered = self._rendered.get(resolve_region(region))
+        if rendered:
+            return rendered
+        return "⚪ Status unknown for this region. (Check global status: " + data.get("global_status", "unknown") + ")"
+
+# Process-wide service (Lazy Loading)
+_service = None
+_service_lock = threading.Lock()
+
+def get_status_service() -> StatusService:
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = StatusService()
+    return _service
@@ -1,42 +1,43 @@
-import json
 import os
+import asyncio
 import logging
-from pathlib import Path
 from langchain_core.tools import tool
-from app.rag_service import get_vector_store
+from app.rag_service import search, asearch
+from app.customer_store import get_customer_store
+from app.status_service import get_status_service
+from app.models import TicketDecision
+from app.metrics import timed
+from app.context_builder import compact_passages, tool_result
 
 logger = logging.getLogger(__name__)
 
-# Constants
-BASE_DIR = Path(__file__).resolve().parent.parent
-DATA_DIR = BASE_DIR / "data"
+# Number of KB chunks returned per search
+KB_TOP_K = 3
 
-# Global variable to hold the vector store instance (Lazy Loading)
-_vectorstore = None
-
-def _get_retriever():
-    global _vectorstore
-    if _vectorstore is None:
-        _vectorstore = get_vector_store()
-    return _vectorstore.as_retriever(search_kwargs={"k": 3})
-
-@tool
-def get_customer_profile(customer_id: str) -> dict:
+def lookup_customer_profile(customer_id: str) -> dict:
     """
-    Look up a customer's profile by their ID.
-    Reads from 'data/customers.json'.
+    Profile of `customer_id` as a dict (read by the tool below and by the prefetch).
     """
     logger.info(f"Tool 'get_customer_profile' called for ID: {customer_id}")
     try:
-        with open(DATA_DIR / "customers.json", "r", encoding="utf-8") as f:
-            customers = json.load(f)
-        result = customers.get(customer_id, {"error": "Customer not found"})
+        with timed("tool.get_customer_profile"):
+            result = get_customer_store().get(customer_id) or {"error": "Customer not found"}
         logger.info(f"Tool Result: Found profile for {result.get('name', 'Unknown')}")
         return result
     except FileNotFoundError:
         logger.error("Database error: customers.json not found")
         return {"error": "Database error: customers.json not found"}
 
+# Tool results go through `tool_result`: compact text, trimmed to the ticket's context budget.
+
+@tool
+def get_customer_profile(customer_id: str) -> str:
+    """
+    Look up a customer's profile by their ID.
+    Served from the indexed customer store (imported from 'data/customers.json').
+    """
+    return tool_result(lookup_customer_profile(customer_id))
+
 @tool
 def check_system_status(region: str) -> str:
     """
@@ -44,43 +45,10 @@ def check_system_status(region: str) -> str:
     Maps input region (e.g. 'Thailand', 'Asia') to internal region keys.
     """
     logger.info(f"Tool 'check_system_status' called for region: {region}")
-    try:
-        with open(DATA_DIR / "system_status.json", "r", encoding="utf-8") as f:
-            status_data = json.load(f)
-    except FileNotFoundError:
-        logger.error("system_status.json not found")
-        return "Error: System status data unavailable."
-
-    # Normalize input variations (e.g. 'thailand' -> 'asia-pacific')
-    region_lower = region.lower()
-    
-    target_key = "unknown"
-    if "asia" in region_lower:
-        target_key = "asia-pacific"
-    elif "us" in region_lower:
-        target_key = "us-east"
-    elif "eu" in region_lower:
-        target_key = "eu-west"
-    else:
-        # Fallback to checking the last known statuses
-        pass
-
-    region_status = status_data["regions"].get(target_key)
-    
-    if region_status:
-        state = region_status.get("status", "unknown")
-        msg = region_status.get("message", "No details")
-        
-        result_str = ""
-        if "outage" in state:
-            result_str = f"🔴 {state.upper()}: {msg}"
-        else:
-            result_str = f"🟢 {state.upper()}: {msg}"
-        
-        logger.info(f"Tool Result: {state}")
-        return result_str
-            
-    return "⚪ Status unknown for this region. (Check global status: " + status_data.get("global_status", "unknown") + ")"
+    with timed("tool.check_system_status"):
+        result = get_status_service().describe(region)
+    logger.info(f"Tool Result: {result}")
+    return tool_result(result)
 
 @tool
 def search_knowledge_base(query: str) -> str:
@@ -89,7 +57,72 @@ def search_knowledge_base(query: str) -> str:
     Use this for feature questions, billing policies, or troubleshooting.
     """
     logger.info(f"Tool 'search_knowledge_base' searching for: '{query}'")
-    retriever = _get_retriever()
-    docs = retriever.invoke(query)
+    with timed("tool.search_knowledge_base"):
+        docs = search(query, k=KB_TOP_K)
     logger.info(f"Tool Result: Retrieved {len(docs)} documents")
-    return "\n\n".join([d.page_content for d in docs])
+    # Overlapping chunks deduplicated, then trimmed to the ticket's context budget.
+    return tool_result(compact_passages([d.page_content for d in docs]))
+
+@tool(args_schema=TicketDecision, return_direct=True)
+def submit_resolution(**decision) -> dict:
+    """
+    Submit the final triage decision. Call this exactly once, as your last step,
+    after you have gathered all the facts you need.
+    """
+    # return_direct: the executor stops here and returns the decision as its output.
+    return decision
+
+# An invalid submission comes back as an error string instead of raising, so the
+# agent can fall back to its structuring pass rather than failing the ticket.
+submit_resolution.handle_validation_error = True
+
+# --- Async variants ---
+# Attached as each tool's coroutine so `AgentExecutor.ainvoke` never blocks the event loop.
+# File lookups run in a worker thread; the KB search uses the vector store's async API.
+
+async def _aget_customer_profile(customer_id: str) -> str:
+    return tool_result(await asyncio.to_thread(lookup_customer_profile, customer_id))
+
+async def _acheck_system_status(region: str) -> str:
+    # Served from memory (see status_service); no need for a worker thread.
+    return check_system_status.func(region)
+
+async def _asearch_knowledge_base(query: str) -> str:
+    logger.info(f"Tool 'search_knowledge_base' searching for: '{query}'")
+    with timed("tool.search_knowledge_base"):
+        docs = await asearch(query, k=KB_TOP_K)
+    logger.info(f"Tool Result: Retrieved {len(docs)} documents")
+    # Overlapping chunks deduplicated, then trimmed to the ticket's context budget.
+    return tool_result(compact_passages([d.page_content for d in docs]))
+
+get_customer_profile.coroutine = _aget_customer_profile
+check_system_status.coroutine = _acheck_system_status
+search_knowledge_base.coroutine = _asearch_knowledge_base
+
+# --- Context prefetch ---
+# Every ticket needs the customer's profile and the status of their region, so both are
+# looked up before the first model turn instead of costing the agent a round-trip each.
+# Results are returned as (tool_name, tool_args, tool_result) so they can be replayed
+# to the model as pre-executed tool calls.
+
+def _prefetched_calls(customer_id: str, profile: dict) -> list[tuple]:
+    calls = [("get_customer_profile", {"customer_id": customer_id}, profile)]
+    region = profile.get("region")
+    if region:
+        logger.info(f"Prefetch: system status for region: {region}")
+        with timed("tool.check_system_status"):
+            calls.append(("check_system_status", {"region": region}, get_status_service().describe(region)))
+    return calls
+
+def prefetch_context(customer_id: str) -> list[tuple]:
+    profile = lookup_customer_profile(customer_id)
+    return _prefetched_calls(customer_id, profile)
+
+async def aprefetch_context(customer_id: str) -> list[tuple]:
+    # The profile and the status document are independent reads, so load them concurrently
+    # (the snapshot call only touches disk when the status file changed).
+    profile, _ = await asyncio.gather(
+        asyncio.to_thread(lookup_customer_profile, customer_id),
+        asyncio.to_thread(get_status_service().snapshot),
+    )
+    return _prefetched_calls(customer_id, profile)
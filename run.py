@@ -1,14 +1,57 @@
+"""
+Starts the API server.
+
+Development (default): one process with auto-reload.
+Production (`--workers N`, or SERVE_MODE=production): N worker processes without reload.
+The KB index and customer store are built once before the workers start; workers then
+map the same files read-only, so each added worker only costs its private state.
+
+Usage: python run.py [--workers 4] [--host 0.0.0.0] [--port 8000]
+"""
 import uvicorn
 import os
 import sys
+import argparse
 from pathlib import Path
+from dotenv import load_dotenv
 
 # Add the project root to sys.path to ensure 'app' and 'scripts' packages are importable
 ROOT_DIR = Path(__file__).resolve().parent
 sys.path.append(str(ROOT_DIR))
 
+# Before any setting is read (here or at app import time), so .env applies to all of them.
+load_dotenv()
+
+SERVE_MODE = os.getenv("SERVE_MODE", "development").lower()
+
+def prepare_shared_data():
+    """
+    Build the on-disk data every worker maps read-only: the KB index (embedded once)
+    and the customer store. Workers that find them current just open them.
+    """
+    from app.rag_service import load_vector_store
+    from app.customer_store import get_customer_store
+
+    load_vector_store()
+    get_customer_store()
+
 if __name__ == "__main__":
-    # Run the FastAPI app defined in app/main.py
-    # "app.main:app" means: module 'app.main', object 'app'
-    print(f"🚀 Starting Server from {ROOT_DIR}...")
-    uvicorn.run("app.main:app", host="127.0.0.1", port=8000, reload=True)
+    parser = argparse.ArgumentParser(description="Run the triage API.")
+    parser.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "0")),
+                        help="Worker processes (production mode; defaults to the CPU count)")
+    args = parser.parse_args()
+
+    production = SERVE_MODE == "production" or args.workers > 0
+    if production:
+        workers = args.workers or os.cpu_count() or 1
+        print(f"🚀 Preparing shared data in {ROOT_DIR}...")
+        prepare_shared_data()
+        print(f"🚀 Starting {workers} worker(s) on {args.host}:{args.port}...")
+        uvicorn.run("app.main:app", host=args.host, port=args.port, workers=workers)
+    else:
+        # Run the FastAPI app defined in app/main.py
+        # "app.main:app" means: module 'app.main', object 'app'
+        print(f"🚀 Starting Server from {ROOT_DIR}...")
+        uvicorn.run("app.main:app", host=args.host, port=args.port, reload=True)
@@ -0,0 +1,78 @@
+"""
+Benchmarks the indexed customer store at several catalogue sizes.
+
+For each size a synthetic JSONL export is generated, bulk-imported, and then
+queried with random lookups. Reports import time, DB size, lookup latency
+percentiles and the resident memory added by the store.
+
+Usage: python scripts/bench_customer_store.py [SIZE ...]   (default: 10000 1000000 5000000)
+"""
+import sys
+import json
+import time
+import random
+import tempfile
+import statistics
+from pathlib import Path
+
+# Add the project root to sys.path to ensure 'app' is importable
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from app.customer_store import CustomerStore
+
+PLANS = ["free", "pro", "enterprise"]
+REGIONS = ["US", "EU", "Asia", "Thailand", "Germany", "Brazil"]
+LOOKUPS = 100_000
+
+def _rss_mb() -> float:
+    with open("/proc/self/status", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+def _write_source(path: Path, size: int):
+    rng = random.Random(size)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(size):
+            f.write(json.dumps({
+                "customer_id": f"cust_{i:08d}",
+                "name": f"Customer {i}",
+                "plan": rng.choice(PLANS),
+                "region": rng.choice(REGIONS),
+                "history_months": rng.randint(0, 120),
+            }) + "\n")
+
+def bench(size: int, workdir: Path):
+    source = workdir / f"customers_{size}.jsonl"
+    db_path = workdir / f"customers_{size}.db"
+    _write_source(source, size)
+
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    store = CustomerStore(source=source, db_path=db_path)
+    import_s = time.perf_counter() - start
+
+    rng = random.Random(0)
+    ids = [f"cust_{rng.randrange(size):08d}" for _ in range(LOOKUPS)]
+    timings = []
+    for customer_id in ids:
+        t0 = time.perf_counter_ns()
+        store.get(customer_id)
+        timings.append(time.perf_counter_ns() - t0)
+    timings.sort()
+
+    print(
+        f"{size:>10,} profiles | import {import_s:7.2f}s | db {db_path.stat().st_size / 2**20:8.1f} MB | "
+        f"lookup p50 {timings[len(timings) // 2] / 1000:6.1f}us p99 {timings[int(len(timings) * 0.99)] / 1000:6.1f}us "
+        f"mean {statistics.fmean(timings) / 1000:6.1f}us | +RSS {_rss_mb() - rss_before:7.1f} MB"
+    )
+    source.unlink()
+    db_path.unlink()
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 1_000_000, 5_000_000]
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            bench(size, Path(tmp))
@@ -0,0 +1,102 @@
+"""
+KB ingestion time vs. corpus size and number of changed chunks.
+
+For each corpus size, a synthetic Markdown corpus is ingested from scratch, then
+`--changes` chunks are edited and the new version is built incrementally. Embeddings
+are the deterministic fakes from scripts/fakes.py with a per-chunk latency standing in
+for an embedding API, so the cost of each re-embedded chunk is visible.
+
+Expected: full builds grow with the corpus; incremental builds grow with the number
+of changed chunks and stay nearly flat across corpus sizes.
+
+Usage: python scripts/bench_ingest.py [--sizes 500 2000 8000] [--changes 1 10 100]
+           [--embedding-ms-per-chunk 2]
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+# Add the project root to sys.path to ensure 'app' and 'scripts' packages are importable
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+# Sections per synthetic document (each section is one chunk)
+SECTIONS_PER_DOC = 50
+
+def _section(doc: int, i: int, revision: int = 0) -> str:
+    return (
+        f"## Policy {doc}.{i} (rev {revision})\n"
+        f"Customers on plan {i % 3} may request item {doc * 1000 + i} within {7 + i % 5} days. "
+        f"Escalate disputes about reference {doc}-{i} to the billing team, and include the invoice "
+        f"number, the charge date and the last four digits of the card on file."
+    )
+
+def _write_corpus(kb_dir: Path, chunks: int):
+    for doc in range((chunks + SECTIONS_PER_DOC - 1) // SECTIONS_PER_DOC):
+        count = min(SECTIONS_PER_DOC, chunks - doc * SECTIONS_PER_DOC)
+        (kb_dir / f"policies-{doc:04d}.md").write_text("\n\n".join(_section(doc, i) for i in range(count)), encoding="utf-8")
+
+def _edit_sections(kb_dir: Path, changes: int, revision: int):
+    # Spread edits across documents; each revision edits sections not touched before.
+    docs = sorted(kb_dir.glob("*.md"))
+    for n in range(changes):
+        path = docs[n % len(docs)]
+        i = (n // len(docs) + revision * 7) % SECTIONS_PER_DOC
+        doc = int(path.stem.split("-")[1])
+        path.write_text(path.read_text(encoding="utf-8").replace(_section(doc, i), _section(doc, i, revision)), encoding="utf-8")
+
+def _ingest(embedding_ms: float) -> tuple[float, dict]:
+    from app import rag_service
+    from app.kb_ingest import EmbeddingStore, IncrementalEmbeddings, store_path
+    from scripts.fakes import FakeEmbeddings
+
+    paths = rag_service.kb_documents()
+    persist_dir = rag_service.INDEX_DIR / rag_service.compute_index_key("local", paths)
+    persist_dir.mkdir(parents=True, exist_ok=True)
+    embeddings = IncrementalEmbeddings(
+        FakeEmbeddings(document_latency_s=embedding_ms / 1000),
+        EmbeddingStore(store_path(rag_service.INDEX_DIR, "fake")),
+    )
+    start = time.perf_counter()
+    rag_service._build_index(persist_dir, embeddings, "local", paths)
+    return time.perf_counter() - start, {"embedded": embeddings.embedded, "reused": embeddings.reused}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 2000, 8000], help="Corpus sizes in chunks")
+    parser.add_argument("--changes", type=int, nargs="+", default=[1, 10, 100], help="Chunks edited per incremental run")
+    parser.add_argument("--embedding-ms-per-chunk", type=float, default=2.0)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench-kb-"))
+    # Settings are read at import time, so configure the environment before importing the app.
+    os.environ["KB_DIR"] = str(workdir / "kb")
+    os.environ["KB_INDEX_DIR"] = str(workdir / "index")
+    from app import rag_service
+    import logging
+    logging.disable(logging.INFO)
+
+    print(f"Fake embedding cost {args.embedding_ms_per_chunk:.1f} ms/chunk\n")
+    try:
+        for size in args.sizes:
+            shutil.rmtree(workdir, ignore_errors=True)
+            rag_service.KB_DIR.mkdir(parents=True)
+            _write_corpus(rag_service.KB_DIR, size)
+            seconds, counts = _ingest(args.embedding_ms_per_chunk)
+            print(f"corpus {size:>6} chunks | full build          {seconds:7.2f}s | embedded {counts['embedded']:>6}")
+            for revision, changes in enumerate(args.changes, start=1):
+                _edit_sections(rag_service.KB_DIR, changes, revision)
+                seconds, counts = _ingest(args.embedding_ms_per_chunk)
+                print(
+                    f"corpus {size:>6} chunks | {changes:>4} changed chunks {seconds:7.2f}s | "
+                    f"embedded {counts['embedded']:>6} | reused {counts['reused']:>6}"
+                )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
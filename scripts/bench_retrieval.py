@@ -0,0 +1,84 @@
+"""
+Compares KB retrieval backends on query latency and recall@k.
+
+Backends:
+- local:            in-process hashing embeddings + NumPy cosine + BM25 hybrid
+- chroma[hashing]:  Chroma with the same local embeddings (isolates the search engine)
+- chroma[openai]:   the production Chroma setup (only when OPENAI_API_KEY is set)
+
+Recall is measured on a small labeled query set: a query counts as recalled when
+any of its top-k chunks contains the expected policy text.
+
+Usage: python scripts/bench_retrieval.py [--k 3] [--repeat 200]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+# Add the project root to sys.path to ensure 'app' and 'scripts' packages are importable
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from langchain_community.vectorstores import Chroma
+from app.rag_service import load_splits, load_vector_store, COLLECTION_NAME
+from app.local_retriever import LocalKnowledgeBase, HashingEmbeddings
+
+# (query, text expected in a retrieved chunk)
+LABELED_QUERIES = [
+    ("refund policy for the pro plan", "within **7 days**"),
+    ("can free users export to PDF or CSV", "No export features"),
+    ("how long until my refund arrives", "5-10 business days"),
+    ("is there a dark mode toggle", "NO manual toggle"),
+    ("I got error 500 internal server error", "Error 500"),
+    ("what happens if I do a chargeback with my bank", "immediate account suspension"),
+    ("enterprise phone support and SLA", "24/7 Phone Support"),
+    ("slow in thailand during peak hours", "ISP throttling"),
+    ("which browsers are supported", "Supported Browsers"),
+    ("error 403 forbidden when exporting", "Error 403"),
+    ("charged twice double charge", "duplicate charges"),
+    ("priority for a total system outage", "Total System Outage"),
+]
+
+def bench_backend(name: str, store, k: int, repeat: int):
+    hits = sum(
+        any(expected in doc.page_content for doc in store.similarity_search(query, k=k))
+        for query, expected in LABELED_QUERIES
+    )
+    timings = []
+    for _ in range(repeat):
+        for query, _ in LABELED_QUERIES:
+            start = time.perf_counter()
+            store.similarity_search(query, k=k)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(
+        f"{name:<16} | recall@{k} {hits / len(LABELED_QUERIES):5.0%} | "
+        f"p50 {timings[len(timings) // 2]:7.3f} ms | p95 {timings[int(len(timings) * 0.95)]:7.3f} ms | "
+        f"mean {statistics.fmean(timings):7.3f} ms"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    splits = load_splits()
+    embeddings = HashingEmbeddings()
+    print(f"KB: {len(splits)} chunks | {len(LABELED_QUERIES)} labeled queries\n")
+
+    bench_backend("local", LocalKnowledgeBase.build(splits, embeddings), args.k, args.repeat)
+    chroma = Chroma.from_documents(splits, embedding=embeddings, collection_name=f"{COLLECTION_NAME}_bench")
+    bench_backend("chroma[hashing]", chroma, args.k, args.repeat)
+
+    if os.getenv("OPENAI_API_KEY"):
+        # Network-bound: keep the repeat count small.
+        bench_backend("chroma[openai]", load_vector_store("chroma"), args.k, max(1, args.repeat // 50))
+    else:
+        print("chroma[openai]   | skipped (OPENAI_API_KEY not set)")
+
+if __name__ == "__main__":
+    main()
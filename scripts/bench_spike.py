@@ -0,0 +1,140 @@
+"""
+Traffic-spike benchmark for the admission scheduler (no API key, no network).
+
+Open-loop load against POST /api/triage through an in-process ASGI client: a calm
+phase, then a spike well above what the fake provider can serve, then calm again.
+The fake provider (scripts/fakes.py) serves at most --capacity LLM calls at once,
+first come first served, like a rate-limited model API. Every ticket takes the agent
+path (rules and decision cache off).
+
+The same load runs twice, with the scheduler off and on, and latency is reported
+per customer plan (cust_02 enterprise, cust_03 pro, cust_01 free). With the
+scheduler, enterprise tickets should keep their calm-phase p99 through the spike
+while free-plan tickets absorb the queueing and the 429s.
+
+Usage: python scripts/bench_spike.py [--capacity 4] [--llm-latency-ms 100]
+           [--calm-rps 8] [--spike-rps 60] [--spike-seconds 5] [--max-queue 32]
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+
+# Add the project root to sys.path to ensure 'app' and 'scripts' packages are importable
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+# (customer, plan, share of traffic)
+MIX = [("cust_02", "enterprise", 0.1), ("cust_03", "pro", 0.3), ("cust_01", "free", 0.6)]
+MESSAGES = [
+    "I was charged twice this month, I want a refund.",
+    "Everything returns 500 errors since this morning!",
+    "How do I export my reports to CSV?",
+    "Which browsers do you support?",
+]
+CALM_SECONDS = 3.0
+
+def _percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else float("nan")
+
+def _arrivals(calm_rps: float, spike_rps: float, spike_seconds: float, seed: int) -> list[tuple[float, str, str]]:
+    """
+    (offset_s, customer_id, plan) for every request, Poisson arrivals per phase.
+    """
+    rng = random.Random(seed)
+    phases = [(CALM_SECONDS, calm_rps), (spike_seconds, spike_rps), (CALM_SECONDS, calm_rps)]
+    arrivals, offset = [], 0.0
+    for duration, rps in phases:
+        end = offset + duration
+        t = offset + rng.expovariate(rps)
+        while t < end:
+            customer_id, plan, _ = rng.choices(MIX, weights=[share for *_, share in MIX])[0]
+            arrivals.append((t, customer_id, plan))
+            t += rng.expovariate(rps)
+        offset = end
+    return arrivals
+
+async def _run(client, arrivals: list) -> dict:
+    by_plan = {plan: {"ok": [], "rejected": 0, "errors": 0} for _, plan, _ in MIX}
+    start = time.perf_counter()
+
+    async def send(i, offset, customer_id, plan):
+        await asyncio.sleep(max(0.0, start + offset - time.perf_counter()))
+        sent = time.perf_counter()
+        response = await client.post(
+            "/api/triage", json={"customer_id": customer_id, "message": f"{MESSAGES[i % len(MESSAGES)]} (ref {i})"}
+        )
+        result = by_plan[plan]
+        if response.status_code == 200:
+            result["ok"].append((time.perf_counter() - sent) * 1000)
+        elif response.status_code == 429:
+            result["rejected"] += 1
+        else:
+            result["errors"] += 1
+
+    await asyncio.gather(*[send(i, *arrival) for i, arrival in enumerate(arrivals)])
+    return by_plan
+
+async def bench(arrivals: list, scheduler_on: bool) -> dict:
+    import httpx
+    import app.main
+    from app import scheduler
+
+    scheduler.SCHEDULER_ENABLED = scheduler_on
+    transport = httpx.ASGITransport(app=app.main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        return await _run(client, arrivals)
+
+def _report(label: str, by_plan: dict):
+    print(f"\nScheduler {label}")
+    for plan, result in by_plan.items():
+        ok = result["ok"]
+        print(
+            f"  {plan:<10} | ok {len(ok):4d} | p50 {_percentile(ok, 0.50):8.0f} ms | p99 {_percentile(ok, 0.99):8.0f} ms"
+            f" | 429 {result['rejected']:4d} | errors {result['errors']}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--capacity", type=int, default=4, help="Concurrent LLM calls the fake provider serves")
+    parser.add_argument("--llm-latency-ms", type=float, default=100.0)
+    parser.add_argument("--calm-rps", type=float, default=8.0)
+    parser.add_argument("--spike-rps", type=float, default=60.0)
+    parser.add_argument("--spike-seconds", type=float, default=5.0)
+    parser.add_argument("--max-queue", type=int, default=32, help="SCHEDULER_MAX_QUEUE for the scheduled run")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    # Settings are read at import time, so configure the environment before importing the app.
+    os.environ["RULES_MODE"] = "off"
+    os.environ["DECISION_CACHE_ENABLED"] = "false"
+    os.environ["LLM_MAX_INFLIGHT"] = str(args.capacity)
+    os.environ["SCHEDULER_MAX_QUEUE"] = str(args.max_queue)
+    os.environ["OUTBOX_DB"] = str(Path(tempfile.mkdtemp(prefix="bench-outbox-")) / "outbox.db")
+    logging.disable(logging.WARNING)
+
+    from app.agent import init_agent
+    from app.rag_service import init_vector_store
+    from scripts.fakes import FakeChatModel, FakeEmbeddings
+
+    agent = init_agent(llm=FakeChatModel(latency_s=args.llm_latency_ms / 1000, capacity=args.capacity))
+    agent.executor.verbose = False
+    init_vector_store(FakeEmbeddings())
+
+    arrivals = _arrivals(args.calm_rps, args.spike_rps, args.spike_seconds, args.seed)
+    print(
+        f"Fake provider: {args.capacity} concurrent calls x {args.llm_latency_ms:.0f} ms | "
+        f"{len(arrivals)} tickets: {args.calm_rps:g} rps, {args.spike_rps:g} rps spike for {args.spike_seconds:g}s, "
+        f"{args.calm_rps:g} rps"
+    )
+    for label, scheduler_on in (("off", False), ("on", True)):
+        _report(label, asyncio.run(bench(arrivals, scheduler_on)))
+
+if __name__ == "__main__":
+    main()
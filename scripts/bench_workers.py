@@ -0,0 +1,182 @@
+"""
+Throughput and memory of the API across worker processes (no API key, no network).
+
+For each worker count, starts `uvicorn scripts.fake_app:app --workers N` (fake LLM, local
+KB backend), drives POST /api/triage at a fixed concurrency, and reports throughput,
+latency percentiles and per-worker memory. The KB index and customer store are prepared
+once beforehand, as `run.py` does in production mode, so workers only map them.
+
+Memory (Linux, from /proc/<pid>/smaps_rollup):
+- RSS:     resident pages, counting shared ones in full
+- PSS:     shared pages split between the processes mapping them
+- private: pages only this worker uses (what each added worker really costs)
+
+Throughput can only scale up to the number of cores (this machine: os.cpu_count()).
+
+Usage: python scripts/bench_workers.py [--workers 1 2 4] [--concurrency 64]
+           [--requests 400] [--llm-latency-ms 50]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+import httpx
+
+# Add the project root to sys.path to ensure 'app', 'scripts' and 'run' are importable
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+READY_TIMEOUT_S = 120.0
+MESSAGES = [
+    ("cust_01", "I was charged twice this month, I want a refund."),
+    ("cust_02", "Is there a dark mode? The white screen hurts my eyes."),
+    ("cust_03", "Everything returns 500 errors since this morning!"),
+    ("cust_01", "How do I export my reports to CSV?"),
+]
+
+def _env(llm_latency_ms: float) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "KB_BACKEND": "local",
+        "FAKE_LLM_LATENCY_MS": str(llm_latency_ms),
+        # Every ticket takes the agent path; quiet, non-blocking logs.
+        "RULES_MODE": "off",
+        "DECISION_CACHE_ENABLED": "false",
+        "LOG_MODE": "production",
+        "LOG_SAMPLE_LEVELS": "INFO=0",
+        "OUTBOX_DB": str(Path(tempfile.mkdtemp(prefix="bench-outbox-")) / "outbox.db"),
+    })
+    return env
+
+def _percentile(ordered: list[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+def _children(pid: int) -> list[int]:
+    children = []
+    for entry in Path("/proc").iterdir():
+        if entry.name.isdigit():
+            try:
+                stat = (entry / "stat").read_text()
+            except OSError:
+                continue
+            # Field 4 (after the parenthesized command name) is the parent PID.
+            if int(stat.rsplit(")", 1)[1].split()[1]) == pid:
+                children.append(int(entry.name))
+    return children
+
+def _memory_mb(pid: int) -> dict:
+    fields = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        name, value = line.split(":", 1)
+        fields[name] = int(value.split()[0]) / 1024
+    return {"rss": fields["Rss"], "pss": fields["Pss"], "private": fields["Private_Clean"] + fields["Private_Dirty"]}
+
+def _worker_memory(server_pid: int, workers: int) -> list[dict]:
+    if not Path("/proc").exists():
+        return []
+    if workers == 1:
+        # uvicorn serves a single worker in the launched process itself.
+        return [_memory_mb(server_pid)]
+    # Otherwise the workers are spawned children (the resource tracker is a child too).
+    return [
+        _memory_mb(pid) for pid in _children(server_pid)
+        if "spawn_main" in Path(f"/proc/{pid}/cmdline").read_text(errors="ignore")
+    ]
+
+async def _wait_ready(base_url: str):
+    start = time.perf_counter()
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.perf_counter() - start < READY_TIMEOUT_S:
+            try:
+                if (await client.get("/readyz")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise TimeoutError(f"{base_url} not ready after {READY_TIMEOUT_S:.0f}s")
+
+async def _load(base_url: str, concurrency: int, requests: int) -> dict:
+    samples = []
+    errors = 0
+    next_index = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=None, limits=limits) as client:
+        async def worker():
+            nonlocal next_index, errors
+            while next_index < requests:
+                i = next_index
+                next_index += 1
+                customer_id, message = MESSAGES[i % len(MESSAGES)]
+                start = time.perf_counter()
+                response = await client.post("/api/triage", json={"customer_id": customer_id, "message": f"{message} (ref {i})"})
+                samples.append((time.perf_counter() - start) * 1000)
+                errors += response.status_code != 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+
+    ordered = sorted(samples)
+    return {
+        "throughput_rps": requests / elapsed,
+        "p50_ms": _percentile(ordered, 0.50),
+        "p95_ms": _percentile(ordered, 0.95),
+        "errors": errors,
+    }
+
+def bench(workers: int, port: int, concurrency: int, requests: int, llm_latency_ms: float) -> dict:
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "scripts.fake_app:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT_DIR, env=_env(llm_latency_ms), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        asyncio.run(_wait_ready(base_url))
+        # Warm every worker (readiness may have been answered by just one of them).
+        asyncio.run(_load(base_url, concurrency, max(concurrency, 4 * workers)))
+        result = asyncio.run(_load(base_url, concurrency, requests))
+        result["memory"] = _worker_memory(server.pid, workers)
+        return result
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--port", type=int, default=8790)
+    args = parser.parse_args()
+
+    os.environ["KB_BACKEND"] = "local"
+    from run import prepare_shared_data
+    prepare_shared_data()
+    print(f"Cores: {os.cpu_count()} | concurrency {args.concurrency} | fake LLM latency {args.llm_latency_ms:.0f} ms\n")
+
+    baseline = None
+    for workers in args.workers:
+        result = bench(workers, args.port, args.concurrency, args.requests, args.llm_latency_ms)
+        baseline = baseline or result["throughput_rps"]
+        line = (
+            f"workers {workers:>2} | {result['throughput_rps']:7.1f} req/s (x{result['throughput_rps'] / baseline:.2f}) | "
+            f"p50 {result['p50_ms']:7.1f} ms | p95 {result['p95_ms']:7.1f} ms | errors {result['errors']}"
+        )
+        memory = result["memory"]
+        if memory:
+            avg = lambda key: sum(m[key] for m in memory) / len(memory)
+            line += (
+                f" | per worker: RSS {avg('rss'):.0f} MB, PSS {avg('pss'):.0f} MB, private {avg('private'):.0f} MB"
+                f" | total PSS {sum(m['pss'] for m in memory):.0f} MB"
+            )
+        print(line)
+
+if __name__ == "__main__":
+    main()
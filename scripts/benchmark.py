@@ -0,0 +1,213 @@
+"""
+Offline load test and micro-benchmarks (no API key, no network).
+
+The chat model and embeddings are replaced by the deterministic stand-ins in
+scripts/fakes.py, with configurable latency, and the KB is served from an
+in-memory local index. Reports:
+
+- tools:     per-call latency of each agent tool (KB search cached and uncached)
+- retrieval: raw vector-store similarity search
+- api:       POST /api/triage through an in-process ASGI client at fixed
+             concurrency levels: p50/p95/p99 latency, throughput, memory
+
+By default the rule engine and decision cache are disabled so every ticket takes
+the agent path; pass --fast-paths to measure the production mix instead.
+
+With --baseline, p95 latencies are compared against a previous --json output and
+the run exits non-zero when any regressed beyond --tolerance (for CI).
+
+Usage: python scripts/benchmark.py [--concurrency 1 8 32] [--requests 200]
+           [--llm-latency-ms 50] [--embedding-latency-ms 5] [--fast-paths]
+           [--json results.json] [--baseline baseline.json] [--tolerance 0.25]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import resource
+import tempfile
+from pathlib import Path
+
+# Add the project root to sys.path to ensure 'app' and 'scripts' packages are importable
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+TOOL_REPEAT = 2000
+RETRIEVAL_REPEAT = 500
+# Regressions smaller than this are treated as timer noise.
+MIN_REGRESSION_MS = 0.5
+
+TICKETS = [
+    ("cust_01", "I was charged twice this month, I want a refund."),
+    ("cust_02", "Is there a dark mode? The white screen hurts my eyes."),
+    ("cust_03", "Everything returns 500 errors since this morning!"),
+    ("cust_01", "How do I export my reports to CSV?"),
+    ("cust_02", "My bank will do a chargeback if this invoice is not fixed."),
+    ("cust_03", "Can you add a calendar integration?"),
+    ("cust_01", "The app is very slow in Thailand during peak hours."),
+    ("cust_02", "Which browsers do you support?"),
+]
+
+def _percentiles(samples_ms: list[float]) -> dict:
+    ordered = sorted(samples_ms)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def _time_calls(fn, args_list: list, repeat: int, before=None) -> dict:
+    samples = []
+    for i in range(repeat):
+        args = args_list[i % len(args_list)]
+        if before:
+            before()
+        start = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return _percentiles(samples)
+
+def _print_row(name: str, result: dict, extra: str = ""):
+    print(
+        f"{name:<36} | p50 {result['p50_ms']:8.3f} ms | p95 {result['p95_ms']:8.3f} ms | "
+        f"p99 {result['p99_ms']:8.3f} ms{extra}"
+    )
+
+def bench_tools() -> dict:
+    from app.tools import get_customer_profile, check_system_status, search_knowledge_base
+    from app.rag_service import embedding_cache, retrieval_cache
+
+    def clear_query_caches():
+        embedding_cache.clear()
+        retrieval_cache.clear()
+
+    queries = [(message,) for _, message in TICKETS]
+    results = {
+        "get_customer_profile": _time_calls(get_customer_profile.func, [("cust_01",), ("cust_02",), ("missing",)], TOOL_REPEAT),
+        "check_system_status": _time_calls(check_system_status.func, [("Thailand",), ("Germany",), ("US",)], TOOL_REPEAT),
+        "search_knowledge_base[cached]": _time_calls(search_knowledge_base.func, queries, TOOL_REPEAT),
+        "search_knowledge_base[uncached]": _time_calls(
+            search_knowledge_base.func, queries, RETRIEVAL_REPEAT, before=clear_query_caches
+        ),
+    }
+    for name, result in results.items():
+        _print_row(name, result)
+    return results
+
+def bench_retrieval(vectorstore) -> dict:
+    from app.rag_service import embedding_cache
+
+    # Query embedding included: the embedding cache is cleared before every call.
+    queries = [(message,) for _, message in TICKETS]
+    result = _time_calls(lambda q: vectorstore.similarity_search(q, k=3), queries, RETRIEVAL_REPEAT, before=embedding_cache.clear)
+    _print_row("similarity_search[k=3]", result)
+    return {"similarity_search": result}
+
+async def _load(client, concurrency: int, requests: int) -> dict:
+    samples = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < requests:
+            i = next_index
+            next_index += 1
+            customer_id, message = TICKETS[i % len(TICKETS)]
+            start = time.perf_counter()
+            response = await client.post(
+                "/api/triage", json={"customer_id": customer_id, "message": f"{message} (ref {i})"}
+            )
+            samples.append((time.perf_counter() - start) * 1000)
+            errors += response.status_code != 200
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    return {**_percentiles(samples), "throughput_rps": requests / elapsed, "errors": errors, "peak_rss_mb": _peak_rss_mb()}
+
+async def bench_api(concurrency_levels: list[int], requests: int) -> dict:
+    import httpx
+    import app.main
+
+    results = {}
+    transport = httpx.ASGITransport(app=app.main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # Warm-up: first-use initialization is not part of the steady state.
+        await _load(client, 1, len(TICKETS))
+        for concurrency in concurrency_levels:
+            result = await _load(client, concurrency, requests)
+            results[f"c={concurrency}"] = result
+            _print_row(
+                f"/api/triage @ concurrency {concurrency}", result,
+                f" | {result['throughput_rps']:7.1f} req/s | errors {result['errors']} | peak RSS {result['peak_rss_mb']:.0f} MB",
+            )
+    return results
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for section, entries in baseline.items():
+        for name, old in entries.items():
+            new = results.get(section, {}).get(name)
+            if new is None or "p95_ms" not in old:
+                continue
+            limit = max(old["p95_ms"] * (1 + tolerance), old["p95_ms"] + MIN_REGRESSION_MS)
+            if new["p95_ms"] > limit:
+                regressions.append(f"{section}/{name}: p95 {old['p95_ms']:.3f} -> {new['p95_ms']:.3f} ms")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="Added latency per fake LLM call")
+    parser.add_argument("--embedding-latency-ms", type=float, default=5.0, help="Added latency per fake query embedding")
+    parser.add_argument("--fast-paths", action="store_true", help="Keep the rule engine and decision cache enabled")
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    parser.add_argument("--baseline", type=Path, help="Fail if p95 regressed against this earlier --json output")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p95 slowdown vs baseline (default 25%%)")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so configure the environment before importing the app.
+    if not args.fast_paths:
+        os.environ["RULES_MODE"] = "off"
+        os.environ["DECISION_CACHE_ENABLED"] = "false"
+    os.environ["OUTBOX_DB"] = str(Path(tempfile.mkdtemp(prefix="bench-outbox-")) / "outbox.db")
+    logging.disable(logging.INFO)
+
+    from app.agent import init_agent
+    from app.rag_service import init_vector_store
+    from scripts.fakes import FakeChatModel, FakeEmbeddings
+
+    agent = init_agent(llm=FakeChatModel(latency_s=args.llm_latency_ms / 1000))
+    agent.executor.verbose = False
+    vectorstore = init_vector_store(FakeEmbeddings(latency_s=args.embedding_latency_ms / 1000))
+    print(
+        f"Fake LLM latency {args.llm_latency_ms:.0f} ms | fake embedding latency {args.embedding_latency_ms:.0f} ms | "
+        f"fast paths {'on' if args.fast_paths else 'off'}\n"
+    )
+
+    results = {
+        "tools": bench_tools(),
+        "retrieval": bench_retrieval(vectorstore),
+        "api": asyncio.run(bench_api(args.concurrency, args.requests)),
+    }
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\nResults written to {args.json}")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+        if regressions:
+            print("\n❌ p95 regressions vs baseline:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("\n✅ No p95 regressions vs baseline.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Offline evaluation of triage quality and speed.
+
+Runs a labeled ticket corpus through `run_agent` across a process pool and scores
+`urgency`, `action` and `target_department` against the labels.
+
+Corpus lines (JSONL):
+  {"ticket_id": "t01", "customer_id": "cust_02", "message": "...", "current_time": "optional",
+   "expected": {"urgency": "critical", "action": "escalate_to_human", "target_department": "Engineering"}}
+
+Tickets without a `current_time` are triaged as of EVAL_TIME, so runs are reproducible.
+Model calls go through the record/replay layer (app/llm_replay.py), selected by --mode:
+
+- replay (default): stored responses only. No network and no API key needed. Tickets with
+  requests that were never recorded are reported as `missing` (all of them if the KB
+  index has to be built from unrecorded embeddings).
+- record: replays what is stored and records the rest with the live model (needs OPENAI_API_KEY).
+- off:    live model, nothing stored.
+
+--fake-llm uses the deterministic FakeChatModel (scripts/fakes.py) as the provider and the
+local KB backend, to try the runner without an API key; --mode then defaults to off.
+
+Usage: python scripts/evaluate.py [data/eval/tickets.jsonl] [--workers 4] [--mode replay]
+           [--repeat 1] [--json report.json] [--fail-under 0.9]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+
+# Add the project root to sys.path to ensure 'app' and 'scripts' packages are importable
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+DEFAULT_CORPUS = ROOT_DIR / "data" / "eval" / "tickets.jsonl"
+EVAL_TIME = "2025-12-15 10:00:00"
+FIELDS = ("urgency", "action", "target_department")
+MISMATCHES_SHOWN = 10
+
+# Set in a worker whose KB index could not be built in replay mode; its tickets are all misses.
+_index_miss: Optional[str] = None
+
+def _init_worker(fake_llm: bool, fake_latency_s: float):
+    # Settings are read from the environment the parent prepared; the app is imported here,
+    # once per worker process, and warmed up before the first ticket.
+    from dotenv import load_dotenv
+    load_dotenv()
+    from app.agent import init_agent, get_agent
+    from app.rag_service import get_vector_store
+    from app.llm_replay import ReplayMiss
+
+    global _index_miss
+    if fake_llm:
+        from scripts.fakes import FakeChatModel
+        init_agent(llm=FakeChatModel(latency_s=fake_latency_s))
+    get_agent()
+    try:
+        get_vector_store()
+    except ReplayMiss as e:
+        # Raising here would break the whole pool; report the tickets as missing instead.
+        _index_miss = f"KB index: {e}"
+
+def _evaluate_chunk(tickets: list[dict]) -> list[dict]:
+    from app.agent import run_agent
+    from app.llm_replay import ReplayMiss
+
+    results = []
+    for ticket in tickets:
+        result = {"ticket_id": ticket["ticket_id"], "predicted": None, "error": None, "missing": False}
+        if _index_miss is not None:
+            result.update(missing=True, error=_index_miss, seconds=0.0)
+            results.append(result)
+            continue
+        start = time.perf_counter()
+        try:
+            decision = run_agent(ticket["message"], ticket["customer_id"], ticket.get("current_time") or EVAL_TIME)
+            result["predicted"] = {field: getattr(decision, field) for field in FIELDS}
+        except ReplayMiss as e:
+            result["missing"] = True
+            result["error"] = str(e)
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["seconds"] = round(time.perf_counter() - start, 4)
+        results.append(result)
+    return results
+
+def load_corpus(path: Path, repeat: int) -> list[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+    if repeat == 1:
+        return corpus
+    return [{**ticket, "ticket_id": f"{ticket['ticket_id']}#{i}"} for i in range(repeat) for ticket in corpus]
+
+def score(corpus: list[dict], results: list[dict]) -> dict:
+    expected = {ticket["ticket_id"]: ticket["expected"] for ticket in corpus}
+    scored = [r for r in results if r["predicted"] is not None]
+    correct = {field: 0 for field in FIELDS}
+    exact = 0
+    mismatches = []
+    for result in scored:
+        labels = expected[result["ticket_id"]]
+        wrong = [field for field in FIELDS if result["predicted"][field] != labels.get(field)]
+        for field in FIELDS:
+            correct[field] += field not in wrong
+        exact += not wrong
+        mismatches.extend(
+            {"ticket_id": result["ticket_id"], "field": field, "expected": labels.get(field), "predicted": result["predicted"][field]}
+            for field in wrong
+        )
+    total = len(scored) or 1
+    return {
+        "tickets": len(results),
+        "scored": len(scored),
+        "missing": sum(r["missing"] for r in results),
+        "errors": sum(r["error"] is not None and not r["missing"] for r in results),
+        "accuracy": {field: correct[field] / total for field in FIELDS},
+        "exact_match": exact / total,
+        "mismatches": mismatches,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", type=Path, nargs="?", default=DEFAULT_CORPUS)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--mode", choices=("replay", "record", "off"),
+                        help="Record/replay mode (default: replay, or off with --fake-llm)")
+    parser.add_argument("--repeat", type=int, default=1, help="Run the corpus this many times (throughput checks)")
+    parser.add_argument("--fake-llm", action="store_true", help="Deterministic fake model instead of the live provider")
+    parser.add_argument("--fake-latency-ms", type=float, default=100.0, help="Per-call latency of --fake-llm")
+    parser.add_argument("--json", type=Path, help="Write the report (with per-ticket results) to this file")
+    parser.add_argument("--fail-under", type=float, help="Exit non-zero if exact-match accuracy is below this")
+    args = parser.parse_args()
+    if args.mode is None:
+        # Nothing is recorded for the fake model on a fresh checkout.
+        args.mode = "off" if args.fake_llm else "replay"
+
+    # Workers inherit these before importing the app (settings are read at import time).
+    os.environ["LLM_REPLAY_MODE"] = args.mode
+    os.environ.setdefault("AGENT_VERBOSE", "false")
+    os.environ.setdefault("KB_WATCH_INTERVAL_S", "0")
+    if args.fake_llm:
+        os.environ["KB_BACKEND"] = "local"
+
+    corpus = load_corpus(args.corpus, args.repeat)
+    workers = max(1, min(args.workers, len(corpus)))
+    # A few chunks per worker keeps the pool balanced without per-ticket IPC.
+    size = max(1, -(-len(corpus) // (workers * 4)))
+    chunks = [corpus[i:i + size] for i in range(0, len(corpus), size)]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(args.fake_llm, args.fake_latency_ms / 1000)) as pool:
+        results = [result for chunk in pool.map(_evaluate_chunk, chunks) for result in chunk]
+    elapsed = time.perf_counter() - start
+
+    report = score(corpus, results)
+    report.update({"mode": args.mode, "workers": workers, "seconds": round(elapsed, 3)})
+    print(
+        f"{report['tickets']} tickets | mode {args.mode} | {workers} workers | {elapsed:.2f}s "
+        f"({report['tickets'] / elapsed:.0f} tickets/s) | missing {report['missing']} | errors {report['errors']}"
+    )
+    for field in FIELDS:
+        print(f"  {field:<18} {report['accuracy'][field]:6.1%}")
+    print(f"  {'exact match':<18} {report['exact_match']:6.1%}  ({report['scored']} scored)")
+    for mismatch in report["mismatches"][:MISMATCHES_SHOWN]:
+        print(f"  ✗ {mismatch['ticket_id']}: {mismatch['field']} expected {mismatch['expected']!r}, got {mismatch['predicted']!r}")
+    if report["missing"]:
+        print(f"  {report['missing']} ticket(s) had unrecorded requests; run once with --mode record to add them.")
+
+    if args.json:
+        report["results"] = results
+        args.json.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Report written to {args.json}")
+
+    if args.fail_under is not None and (report["exact_match"] < args.fail_under or report["missing"] or report["errors"]):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
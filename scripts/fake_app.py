@@ -0,0 +1,18 @@
+"""
+ASGI entry point for multi-process benchmarks: `app.main:app` with the agent's chat
+model replaced by the deterministic FakeChatModel (scripts/fakes.py), so uvicorn
+workers can be load-tested without an API key.
+
+Fake LLM latency per call: FAKE_LLM_LATENCY_MS (default 50).
+
+Usage: uvicorn scripts.fake_app:app --workers 4
+"""
+import os
+from app.agent import init_agent
+from scripts.fakes import FakeChatModel
+import app.main
+
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "50"))
+
+init_agent(llm=FakeChatModel(latency_s=FAKE_LLM_LATENCY_MS / 1000))
+app = app.main.app
@@ -0,0 +1,171 @@
+"""
+Deterministic stand-ins for the model provider, used by the benchmarks.
+
+- FakeChatModel: a tool-calling chat model that searches the KB once and then
+  submits a keyword-derived decision. Same input, same output; no network.
+- FakeEmbeddings: the built-in hashing embedder with optional added latency.
+
+Both accept a `latency_s` so runs can approximate provider round-trip times.
+FakeChatModel's `capacity` additionally caps concurrent async calls (callers beyond
+it wait in arrival order), approximating a provider's throughput limit.
+"""
+import json
+import time
+import asyncio
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from app.local_retriever import HashingEmbeddings
+
+# Characters per streamed chunk of tool-call arguments
+STREAM_CHUNK_CHARS = 16
+
+# (keywords, decision fields) checked in order; the last entry is the default.
+_POLICIES = [
+    (("sue", "lawyer", "chargeback", "bank"), dict(
+        urgency="high", issue_type="Billing", action="escalate_to_human", target_department="Billing")),
+    (("refund", "money back", "charged"), dict(
+        urgency="medium", issue_type="Billing", action="escalate_to_human", target_department="Billing")),
+    (("500", "down", "error", "outage", "crash"), dict(
+        urgency="high", issue_type="Technical", action="escalate_to_human", target_department="Engineering")),
+    (("feature", "dark mode", "export", "add"), dict(
+        urgency="low", issue_type="Feature Request", action="auto_respond", target_department="Product")),
+    ((), dict(urgency="low", issue_type="General Inquiry", action="route_to_specialist", target_department="Support")),
+]
+
+def fake_decision(message: str) -> dict:
+    text = message.lower()
+    for keywords, fields in _POLICIES:
+        if not keywords or any(k in text for k in keywords):
+            break
+    return {
+        **fields,
+        "sentiment": "frustrated" if "!" in message else "neutral",
+        "internal_ticket_note": f"[fake] {fields['issue_type']} ticket: {message[:80]}",
+        "user_response": "Thank you for reaching out. We have reviewed your request and will follow up shortly.",
+        "reasoning_trace": f"[fake] Keyword policy -> {fields['action']}.",
+    }
+
+# capacity -> semaphore shared by every copy of the model (bind_tools makes copies).
+_provider_slots = {}
+
+async def _provider_round_trip(capacity: int, latency_s: float):
+    if not capacity:
+        await asyncio.sleep(latency_s)
+        return
+    async with _provider_slots.setdefault(capacity, asyncio.Semaphore(capacity)):
+        await asyncio.sleep(latency_s)
+
+def _estimate_tokens(messages) -> int:
+    return sum(len(str(m.content)) for m in messages) // 4 + 1
+
+class FakeChatModel(BaseChatModel):
+    """
+    Turn 1: call `search_knowledge_base` with the ticket text.
+    Turn 2: call `submit_resolution` (single-pass) or answer in text (two-pass).
+    """
+
+    latency_s: float = 0.0
+    capacity: int = 0
+    bound_tools: list[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-triage"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={"bound_tools": [getattr(t, "name", str(t)) for t in tools]})
+
+    def with_structured_output(self, schema, **kwargs):
+        def structure(prompt):
+            time.sleep(self.latency_s)
+            return schema(**fake_decision(str(prompt)), executed_tools=["search_knowledge_base"])
+
+        async def astructure(prompt):
+            await _provider_round_trip(self.capacity, self.latency_s)
+            return schema(**fake_decision(str(prompt)), executed_tools=["search_knowledge_base"])
+
+        return RunnableLambda(structure, afunc=astructure)
+
+    def _reply(self, messages) -> AIMessage:
+        ticket = next((str(m.content) for m in messages if m.type == "human"), "")
+        # Streamed turns come back as AIMessageChunk (type "AIMessageChunk"), hence isinstance.
+        turns = [m for m in messages if isinstance(m, AIMessage)]
+        searched = any(call["name"] == "search_knowledge_base" for m in turns for call in m.tool_calls)
+        turn = len(turns)
+        if not searched:
+            call = {"name": "search_knowledge_base", "args": {"query": ticket[-200:]}, "id": f"fake_{turn}"}
+        elif "submit_resolution" in self.bound_tools:
+            call = {"name": "submit_resolution", "args": fake_decision(ticket), "id": f"fake_{turn}"}
+        else:
+            return AIMessage(content="Decision ready.")
+        return AIMessage(content="", tool_calls=[call])
+
+    def _usage(self, messages, reply: AIMessage) -> dict:
+        prompt = _estimate_tokens(messages)
+        completion = len(json.dumps(reply.tool_calls) + str(reply.content)) // 4 + 1
+        return {"input_tokens": prompt, "output_tokens": completion, "total_tokens": prompt + completion}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency_s)
+        reply = self._reply(messages)
+        reply.usage_metadata = self._usage(messages, reply)
+        return ChatResult(generations=[ChatGeneration(message=reply)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await _provider_round_trip(self.capacity, self.latency_s)
+        reply = self._reply(messages)
+        reply.usage_metadata = self._usage(messages, reply)
+        return ChatResult(generations=[ChatGeneration(message=reply)])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        # Whole latency before the first chunk, then the arguments in small pieces
+        # (exercises the streaming endpoint's partial-argument parsing).
+        await _provider_round_trip(self.capacity, self.latency_s)
+        reply = self._reply(messages)
+        usage = self._usage(messages, reply)
+        if not reply.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(content=reply.content, usage_metadata=usage))
+            return
+        call = reply.tool_calls[0]
+        args = json.dumps(call["args"])
+        pieces = [args[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(args), STREAM_CHUNK_CHARS)]
+        for i, piece in enumerate(pieces):
+            first, last = i == 0, i == len(pieces) - 1
+            tool_chunk = {
+                "name": call["name"] if first else None,
+                "args": piece,
+                "id": call["id"] if first else None,
+                "index": 0,
+            }
+            chunk = ChatGenerationChunk(message=AIMessageChunk(
+                content="", tool_call_chunks=[tool_chunk], usage_metadata=usage if last else None
+            ))
+            if run_manager:
+                await run_manager.on_llm_new_token("", chunk=chunk)
+            yield chunk
+
+class FakeEmbeddings(Embeddings):
+    """
+    Hashing embeddings (deterministic, offline) plus a fixed per-query latency and,
+    optionally, a per-text latency for document batches (an embedding API's cost).
+    """
+
+    def __init__(self, latency_s: float = 0.0, document_latency_s: float = 0.0):
+        self.latency_s = latency_s
+        self.document_latency_s = document_latency_s
+        self._embedder = HashingEmbeddings()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        time.sleep(self.document_latency_s * len(texts))
+        return self._embedder.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        time.sleep(self.latency_s)
+        return self._embedder.embed_query(text)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        await asyncio.sleep(self.latency_s)
+        return self._embedder.embed_query(text)
@@ -0,0 +1,88 @@
+"""
+Measures cold-start cost of the API in fresh processes.
+
+- import:  time to `import app.main` (module load only)
+- live:    from process launch until uvicorn answers HTTP (liveness)
+- ready:   from process launch until GET /readyz returns 200 (warm-up finished);
+           servers without a readiness probe count as ready once live
+
+The server runs with KB_BACKEND=local (no network needed) unless KB_BACKEND is set,
+and with a placeholder OPENAI_API_KEY if none is configured (no model calls are made).
+
+Usage: python scripts/measure_startup.py [--runs 5] [--port 8765]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+import httpx
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+POLL_INTERVAL_S = 0.02
+TIMEOUT_S = 120.0
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env.setdefault("KB_BACKEND", "local")
+    env.setdefault("OPENAI_API_KEY", "placeholder-not-used")
+    return env
+
+def measure_import() -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT_DIR, env=_env(),
+        capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+def _wait_for(url: str, start: float, ready: bool) -> float:
+    while time.perf_counter() - start < TIMEOUT_S:
+        try:
+            response = httpx.get(url, timeout=1.0)
+            if not ready or response.status_code in (200, 404):
+                return time.perf_counter() - start
+        except httpx.TransportError:
+            pass
+        time.sleep(POLL_INTERVAL_S)
+    raise TimeoutError(f"{url} not available after {TIMEOUT_S:.0f}s")
+
+def measure_server(port: int) -> tuple[float, float]:
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT_DIR, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        live = _wait_for(f"http://127.0.0.1:{port}/", start, ready=False)
+        ready = _wait_for(f"http://127.0.0.1:{port}/readyz", start, ready=True)
+    finally:
+        server.terminate()
+        server.wait()
+    return live, ready
+
+def _report(name: str, samples: list[float]):
+    print(f"{name:<8} | median {statistics.median(samples):6.2f}s | min {min(samples):6.2f}s | max {max(samples):6.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import and startup time of the API.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    imports, lives, readies = [], [], []
+    for _ in range(args.runs):
+        imports.append(measure_import())
+        live, ready = measure_server(args.port)
+        lives.append(live)
+        readies.append(ready)
+
+    _report("import", imports)
+    _report("live", lives)
+    _report("ready", readies)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Reports what the agent sends to the model per ticket (no API key, no network).
+
+Runs the benchmark tickets through the agent with a recording FakeChatModel, in
+single-pass mode and in two-pass mode (agent turns + structuring call), and prints:
+
+- calls:      model calls per ticket
+- prompt:     prompt tokens per ticket (mean / max), every call's messages included
+- prefix:     tokens at the start of every prompt that are identical across tickets
+              (what provider-side prefix caching can reuse)
+- uncached:   prompt tokens per ticket outside that shared prefix (billed at full price
+              when the prefix is served from the provider's cache)
+
+Tokens are estimated as characters / 4; tool schemas are the same for every call
+and are not counted.
+
+Usage: python scripts/report_prompt_tokens.py [--json tokens.json]
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import statistics
+from pathlib import Path
+
+# Add the project root to sys.path to ensure 'app' and 'scripts' packages are importable
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from scripts.benchmark import TICKETS
+
+def _render(messages) -> str:
+    parts = []
+    for m in messages:
+        tool_calls = json.dumps(getattr(m, "tool_calls", None) or [], ensure_ascii=False)
+        parts.append(f"<{m.type}>{m.content}{tool_calls if tool_calls != '[]' else ''}")
+    return "".join(parts)
+
+def _tokens(text: str) -> int:
+    return len(text) // 4
+
+def _common_prefix(texts: list[str]) -> str:
+    return os.path.commonprefix(texts) if texts else ""
+
+def measure(single_pass: bool) -> dict:
+    from app.agent import init_agent
+    from scripts.fakes import FakeChatModel
+
+    prompts = []
+
+    class RecordingChatModel(FakeChatModel):
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            prompts.append(_render(messages))
+            return super()._generate(messages, stop, run_manager, **kwargs)
+
+        def with_structured_output(self, schema, **kwargs):
+            structured = super().with_structured_output(schema, **kwargs)
+
+            def record(prompt):
+                prompts.append(str(prompt))
+                return structured.invoke(prompt)
+
+            from langchain_core.runnables import RunnableLambda
+            return RunnableLambda(record)
+
+    agent = init_agent(llm=RecordingChatModel(), single_pass=single_pass)
+    agent.executor.verbose = False
+    tickets = []
+    for i, (customer_id, message) in enumerate(TICKETS):
+        if i == 1:
+            # Production tickets arrive at different times; so must these.
+            time.sleep(1.0)
+        start = len(prompts)
+        agent.run(message, customer_id)
+        tickets.append(prompts[start:])
+    prefix = _common_prefix([calls[0] for calls in tickets])
+    tokens = [sum(_tokens(p) for p in calls) for calls in tickets]
+    uncached = [sum(_tokens(p) - _tokens(_common_prefix([p, prefix])) for p in calls) for calls in tickets]
+    return {
+        "calls_per_ticket": statistics.mean(len(calls) for calls in tickets),
+        "prompt_tokens_mean": statistics.mean(tokens),
+        "prompt_tokens_max": max(tokens),
+        "shared_prefix_tokens": _tokens(prefix),
+        "uncached_tokens_mean": statistics.mean(uncached),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    # Every ticket takes the agent path; the KB is served from the local index.
+    os.environ["RULES_MODE"] = "off"
+    os.environ["DECISION_CACHE_ENABLED"] = "false"
+    logging.disable(logging.WARNING)
+
+    from app.rag_service import init_vector_store
+    from scripts.fakes import FakeEmbeddings
+
+    init_vector_store(FakeEmbeddings())
+    results = {}
+    for mode, single_pass in (("single-pass", True), ("two-pass", False)):
+        result = results[mode] = measure(single_pass)
+        print(
+            f"{mode:<12} | calls {result['calls_per_ticket']:.1f} | prompt tokens/ticket "
+            f"mean {result['prompt_tokens_mean']:7.0f} max {result['prompt_tokens_max']:6d} | "
+            f"shared prefix {result['shared_prefix_tokens']:5d} | uncached/ticket {result['uncached_tokens_mean']:6.0f}"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+if __name__ == "__main__":
+    main()
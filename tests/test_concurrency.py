@@ -0,0 +1,70 @@
+import time
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import httpx
+import app.main
+import app.outbox
+import app.pipeline
+from app.models import TicketResolution
+from app.outbox import CRMOutbox
+from app.rules import rule_engine
+
+STUB_AGENT_LATENCY_S = 1.0
+CONCURRENT_TICKETS = 20
+
+async def _stub_arun_agent(message: str, customer_id: str, on_event=None) -> TicketResolution:
+    await asyncio.sleep(STUB_AGENT_LATENCY_S)
+    return TicketResolution(
+        urgency="critical",
+        issue_type="Technical",
+        sentiment="frustrated",
+        action="escalate_to_human",
+        target_department="Engineering",
+        internal_ticket_note="Stubbed decision.",
+        user_response="I have escalated your case to Engineering immediately.",
+        executed_tools=[],
+        reasoning_trace="Stubbed agent for concurrency check.",
+    )
+
+class ConcurrencyTest(unittest.IsolatedAsyncioTestCase):
+    """
+    One worker serves concurrent tickets in parallel: with the agent replaced by a stub
+    that awaits a fixed "LLM" latency, N concurrent POST /api/triage calls on one event
+    loop take about as long as a single call.
+    """
+
+    def setUp(self):
+        outbox_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(outbox_dir.cleanup)
+        # Every ticket must reach the stubbed agent, and nothing may touch data/outbox.db.
+        for patcher in (
+            mock.patch.object(app.pipeline, "arun_agent", _stub_arun_agent),
+            mock.patch.object(app.pipeline, "DECISION_CACHE_ENABLED", False),
+            mock.patch.object(rule_engine, "mode", "off"),
+            mock.patch.object(app.outbox, "_outbox", CRMOutbox(Path(outbox_dir.name) / "outbox.db")),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def _timed_batch(self, client: httpx.AsyncClient, n: int) -> float:
+        payload = {"customer_id": "cust_02", "message": "Everything returns 500 errors!"}
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[client.post("/api/triage", json=payload) for _ in range(n)])
+        elapsed = time.perf_counter() - start
+        self.assertEqual([r.status_code for r in responses], [200] * n, [r.text for r in responses if r.status_code != 200])
+        return elapsed
+
+    async def test_concurrent_tickets_take_about_single_ticket_time(self):
+        transport = httpx.ASGITransport(app=app.main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            single = await self._timed_batch(client, 1)
+            concurrent = await self._timed_batch(client, CONCURRENT_TICKETS)
+        # Serial handling would take ~n * single; allow generous scheduling slack.
+        self.assertLess(concurrent, single * 2, "Concurrent tickets were serialized on the event loop")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import asyncio
+import unittest
+
+from app.decision_cache import DecisionCache
+from app.models import TicketResolution
+
+BUCKET = ("enterprise", "asia-pacific", "major_outage")
+VERSION = (1, "index-1")
+MESSAGE = "Everything returns 500 errors since this morning"
+
+def _resolution(issue_type: str, name: str) -> TicketResolution:
+    return TicketResolution(
+        urgency="critical",
+        issue_type=issue_type,
+        sentiment="frustrated",
+        action="escalate_to_human",
+        target_department="Engineering",
+        internal_ticket_note=f"{name} reported an outage.",
+        user_response=f"Hi {name}, we are on it.",
+        executed_tools=[],
+        reasoning_trace="Confirmed outage.",
+    )
+
+class DecisionCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def _storm(self, cache: DecisionCache, issue_type: str, n: int) -> tuple[list, list]:
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return _resolution(issue_type, "Alice")
+
+        names = ["Alice"] + [f"Customer {i}" for i in range(1, n)]
+        results = await asyncio.gather(*[cache.resolve(BUCKET, MESSAGE, name, VERSION, compute) for name in names])
+        return calls, results
+
+    async def test_concurrent_identical_misses_share_one_run(self):
+        cache = DecisionCache()
+        calls, results = await self._storm(cache, "Technical", 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([reused for _, reused in results], [False, True, True, True, True])
+        self.assertEqual(results[3][0].user_response, "Hi Customer 3, we are on it.")
+        self.assertEqual(cache.stats()["coalesced"], 4)
+
+    async def test_uncacheable_decisions_are_not_shared(self):
+        cache = DecisionCache()
+        calls, results = await self._storm(cache, "Billing", 3)
+        self.assertEqual(len(calls), 3)
+        self.assertFalse(any(reused for _, reused in results))
+
+    async def test_failed_leader_lets_followers_run(self):
+        cache = DecisionCache()
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            if len(calls) == 1:
+                raise RuntimeError("provider error")
+            return _resolution("Technical", "Bob")
+
+        results = await asyncio.gather(
+            cache.resolve(BUCKET, MESSAGE, "Alice", VERSION, compute),
+            cache.resolve(BUCKET, MESSAGE, "Bob", VERSION, compute),
+            return_exceptions=True,
+        )
+        self.assertIsInstance(results[0], RuntimeError)
+        self.assertEqual(results[1][1], False)
+        self.assertEqual(len(calls), 2)
+
+    def test_numbers_and_negations_must_match(self):
+        cache = DecisionCache()
+        cache.store(BUCKET, "The export failed 3 days ago", "Alice", VERSION, _resolution("Technical", "Alice"))
+        self.assertIsNone(cache.lookup(BUCKET, "The export failed 30 days ago", "Bob", VERSION))
+        self.assertIsNone(cache.lookup(BUCKET, "The export has not failed 3 days ago", "Bob", VERSION))
+        self.assertIsNotNone(cache.lookup(BUCKET, "The export failed 3 days ago!", "Bob", VERSION))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from app import scheduler
+from app.scheduler import AgentScheduler, SchedulerBusy
+
+@mock.patch.object(scheduler, "SCHEDULER_ENABLED", True)
+class AgentSchedulerTest(unittest.IsolatedAsyncioTestCase):
+    async def _hold(self, sched: AgentScheduler, priority: int, started: asyncio.Event, done: asyncio.Event):
+        async with sched.admit(priority):
+            started.set()
+            await done.wait()
+
+    async def test_displaced_then_cancelled_waiter_releases_nothing(self):
+        sched = AgentScheduler(max_inflight=1, max_queue=1)
+        started, done = asyncio.Event(), asyncio.Event()
+        holder = asyncio.create_task(self._hold(sched, 10, started, done))
+        await started.wait()
+
+        low = asyncio.create_task(self._hold(sched, 20, asyncio.Event(), done))
+        await asyncio.sleep(0)
+        self.assertEqual(sched.stats()["queued_interactive"], 1)
+
+        # The high-priority ticket displaces the queued one, which is cancelled
+        # (client disconnect) before it gets to see its SchedulerBusy.
+        high_started = asyncio.Event()
+        high = asyncio.create_task(self._hold(sched, 0, high_started, done))
+        await asyncio.sleep(0)
+        low.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await low
+        self.assertEqual(sched.stats()["rejected"], 1)
+        self.assertEqual(sched.stats()["inflight"], 1)
+        self.assertFalse(high_started.is_set())
+
+        done.set()
+        await asyncio.gather(holder, high)
+        self.assertTrue(high_started.is_set())
+        self.assertEqual(sched.stats()["inflight"], 0)
+        self.assertEqual(sched.stats()["queued_interactive"], 0)
+
+    async def test_displaced_waiter_gets_scheduler_busy(self):
+        sched = AgentScheduler(max_inflight=1, max_queue=1)
+        started, done = asyncio.Event(), asyncio.Event()
+        holder = asyncio.create_task(self._hold(sched, 10, started, done))
+        await started.wait()
+        low = asyncio.create_task(self._hold(sched, 20, asyncio.Event(), done))
+        await asyncio.sleep(0)
+        high = asyncio.create_task(self._hold(sched, 0, asyncio.Event(), done))
+        with self.assertRaises(SchedulerBusy):
+            await low
+        done.set()
+        await asyncio.gather(holder, high)
+        self.assertEqual(sched.stats()["inflight"], 0)
+
+    async def test_failed_run_returns_its_rate_reservation(self):
+        sched = AgentScheduler(max_inflight=4, rpm=60, tpm=60000, est_calls=2, est_tokens=4000)
+        with self.assertRaises(RuntimeError):
+            async with sched.admit(10):
+                raise RuntimeError("failed before the first LLM call")
+        self.assertAlmostEqual(sched.requests.level, sched.requests.capacity, delta=0.5)
+        self.assertAlmostEqual(sched.tokens.level, sched.tokens.capacity, delta=50)
+
+    async def test_finished_run_is_charged_its_actual_usage(self):
+        sched = AgentScheduler(max_inflight=4, rpm=60, tpm=60000, est_calls=2, est_tokens=4000)
+        async with sched.admit(10):
+            scheduler.record_llm_usage(1500)
+            scheduler.record_llm_usage(1500)
+            scheduler.record_llm_usage(1500)
+        self.assertAlmostEqual(sched.requests.level, sched.requests.capacity - 3, delta=0.5)
+        self.assertAlmostEqual(sched.tokens.level, sched.tokens.capacity - 4500, delta=50)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+Bulk triage runner: streams JSONL tickets in and JSONL results out.
+
+Input lines:  {"ticket_id": "optional", "customer_id": "cust_01", "message": "..."}
+Output lines: {"ticket_id": "...", "result": <TriageResponse> | null, "error": "..." | null}
+
+Results are appended and flushed as each ticket finishes, so a crashed run can be
+resumed with the same command: tickets that already have a result in the output
+file are skipped (failed ones are retried). Lines that are not valid tickets are
+reported on stderr with their line number and skipped.
+
+Usage: python triage_batch.py tickets.jsonl results.jsonl [--concurrency 8] [--no-resume]
+       (use '-' as input to read stdin)
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+from pathlib import Path
+from dotenv import load_dotenv
+from pydantic import ValidationError
+
+# Add the project root to sys.path to ensure 'app' and 'scripts' packages are importable
+ROOT_DIR = Path(__file__).resolve().parent
+sys.path.append(str(ROOT_DIR))
+
+load_dotenv()
+
+from app.models import BatchTicket
+from app.pipeline import triage_many, CRM_OUTBOX_ENABLED
+from app.outbox import get_outbox
+
+PROGRESS_EVERY = 100
+
+def _completed_ticket_ids(output_path: Path) -> set:
+    done = set()
+    if not output_path.exists():
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError:
+                # Last line of a crashed run may be truncated.
+                continue
+            if item.get("result") is not None:
+                done.add(item["ticket_id"])
+    return done
+
+def _raw_ticket_id(line: str):
+    try:
+        item = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    return item.get("ticket_id") if isinstance(item, dict) else None
+
+def _read_tickets(input_file, skip: set, counters: dict):
+    for position, line in enumerate(input_file):
+        if not line.strip():
+            continue
+        try:
+            ticket = BatchTicket.model_validate_json(line)
+        except ValidationError as e:
+            # Malformed JSON also lands here; one bad line must not abort (or block resuming) the run.
+            counters["invalid"] += 1
+            print(
+                f"⚠️ Skipping invalid line {position + 1} (ticket_id: {_raw_ticket_id(line)}): "
+                f"{e.error_count()} error(s), first: {e.errors()[0]['msg']}",
+                file=sys.stderr,
+            )
+            continue
+        if ticket.ticket_id is None:
+            ticket.ticket_id = f"line-{position + 1}"
+        if ticket.ticket_id in skip:
+            counters["skipped"] += 1
+            continue
+        yield ticket
+
+async def run(input_file, output_path: Path, concurrency: int, resume: bool):
+    skip = _completed_ticket_ids(output_path) if resume else set()
+    counters = {"ok": 0, "failed": 0, "skipped": 0, "invalid": 0}
+    mode = "a" if resume else "w"
+    start = time.perf_counter()
+    if CRM_OUTBOX_ENABLED:
+        get_outbox().start()
+
+    with open(output_path, mode, encoding="utf-8") as out:
+        async for item in triage_many(_read_tickets(input_file, skip, counters), concurrency):
+            out.write(item.model_dump_json() + "\n")
+            out.flush()
+            counters["failed" if item.error else "ok"] += 1
+            processed = counters["ok"] + counters["failed"]
+            if processed % PROGRESS_EVERY == 0:
+                rate = processed / (time.perf_counter() - start)
+                print(f"... {processed} tickets ({rate:.1f} tickets/s)", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    if CRM_OUTBOX_ENABLED:
+        # Give queued CRM tickets a chance to go out; anything left is delivered on the next run.
+        await get_outbox().drain()
+        await get_outbox().stop()
+    processed = counters["ok"] + counters["failed"]
+    rate = processed / elapsed if elapsed > 0 else 0.0
+    print(
+        f"✅ Processed {processed} tickets in {elapsed:.1f}s ({rate:.2f} tickets/s) | "
+        f"ok: {counters['ok']} | failed: {counters['failed']} | skipped (already done): {counters['skipped']} | invalid lines: {counters['invalid']}",
+        file=sys.stderr,
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Triage a JSONL file of tickets.")
+    parser.add_argument("input", help="Input JSONL file, or '-' for stdin")
+    parser.add_argument("output", type=Path, help="Output JSONL file (appended to when resuming)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Max tickets in flight (default: 8)")
+    parser.add_argument("--no-resume", dest="resume", action="store_false",
+                        help="Overwrite the output instead of skipping tickets already completed")
+    args = parser.parse_args()
+
+    if args.input == "-":
+        asyncio.run(run(sys.stdin, args.output, args.concurrency, args.resume))
+    else:
+        with open(args.input, "r", encoding="utf-8") as input_file:
+            asyncio.run(run(input_file, args.output, args.concurrency, args.resume))
+
+if __name__ == "__main__":
+    main()